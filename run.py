@@ -7,33 +7,52 @@
 import os
 import sys
 import argparse
+import heapq
+import importlib.util
 import json
+import shutil
+from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=None)
+def is_installed(module_name):
+    """Проверяет наличие модуля без его импорта (результат кэшируется)"""
+    return importlib.util.find_spec(module_name) is not None
+
 def check_dependencies():
     """Проверяет наличие необходимых зависимостей"""
-    try:
-        import bs4
+    if is_installed('bs4'):
         print("✅ BeautifulSoup4 установлен")
-    except ImportError:
+    else:
         print("❌ BeautifulSoup4 не установлен")
         print("Установите: pip install beautifulsoup4")
         return False
     
-    try:
-        import lxml
+    if is_installed('lxml'):
         print("✅ lxml установлен")
-    except ImportError:
-        print("⚠️  lxml не установлен (рекомендуется для лучшей производительности)")
+    else:
+        print("❌ lxml не установлен (используется парсерами HTML)")
         print("Установите: pip install lxml")
+        return False
+    
+    if is_installed('orjson'):
+        print("✅ orjson установлен")
+    else:
+        print("⚠️  orjson не установлен (рекомендуется для быстрой загрузки и сохранения JSON)")
+        print("Установите: pip install orjson")
+    
+    if is_installed('ijson'):
+        print("✅ ijson установлен")
+    else:
+        print("⚠️  ijson не установлен (рекомендуется для потокового чтения больших JSON)")
+        print("Установите: pip install ijson")
     
     return True
 
 def cleanup_data():
     """Очищает ненужные файлы из папки data"""
-    import glob
-    
     files_to_remove = [
         "data/1c_summary.json",
         "data/context_chunks/",
@@ -43,66 +62,66 @@ def cleanup_data():
     print("🧹 Очистка ненужных файлов...")
     
     for pattern in files_to_remove:
-        if pattern.endswith('/'):
+        path = Path(pattern)
+        if path.is_dir():
             # Удаляем папку
-            if os.path.exists(pattern):
-                import shutil
-                shutil.rmtree(pattern)
-                print(f"🗑️  Удалена папка: {pattern}")
-        else:
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"🗑️  Удалена папка: {pattern}")
+        elif path.is_file():
             # Удаляем файл
-            if os.path.exists(pattern):
-                os.remove(pattern)
-                print(f"🗑️  Удален файл: {pattern}")
+            path.unlink(missing_ok=True)
+            print(f"🗑️  Удален файл: {pattern}")
     
     print("✅ Очистка завершена")
 
 def run_parser(zip_file, max_files=None, use_improved=True):
     """Запускает парсинг файла"""
+    from src.parsers.hbk_parser import analyze
+    from src.parsers.bsl_syntax_extractor import extract
+    from src.converters.context_converter import ContextConverter
+    
     print(f"🔍 Анализ структуры: {zip_file}")
-    os.system(f"set PYTHONPATH=src && python src/parsers/hbk_parser.py {zip_file}")
+    try:
+        analyze(zip_file)
+    except Exception as e:
+        # Анализ структуры - диагностический шаг, его сбой не должен мешать извлечению
+        print(f"⚠️  Анализ структуры не выполнен: {e}")
     
     print(f"📝 Извлечение синтаксиса: {zip_file}")
-    if max_files:
-        os.system(f"set PYTHONPATH=src && python src/parsers/bsl_syntax_extractor.py {zip_file} --max-files {max_files}")
-    else:
-        os.system(f"set PYTHONPATH=src && python src/parsers/bsl_syntax_extractor.py {zip_file}")
-    
-    # Определяем имя JSON файла
-    base_name = Path(zip_file).stem
-    json_file = f"data/bsl_syntax_{base_name}.json" if "root" in base_name else "data/bsl_syntax.json"
-    md_file = json_file.replace('.json', '.md')
+    syntax_data = extract(zip_file, max_files=max_files)
     
-    if os.path.exists(json_file):
-        print(f"🔄 Создание контекста: {json_file}")
+    if syntax_data:
+        print(f"🔄 Создание контекста: {zip_file}")
+        # Передаем данные конвертеру напрямую, без промежуточного bsl_syntax.json
         # Создаем только основные файлы: JSON, TXT и поисковый индекс
-        os.system(f"set PYTHONPATH=src && python src/converters/context_converter.py {json_file} json,txt,search_index")
-        
-        # Удаляем промежуточные файлы после конвертации
-        if os.path.exists(json_file):
-            os.remove(json_file)
-            print(f"🗑️  Удален промежуточный файл: {json_file}")
-        if os.path.exists(md_file):
-            os.remove(md_file)
-            print(f"🗑️  Удален промежуточный файл: {md_file}")
+        ContextConverter.from_data(syntax_data).convert(['json', 'txt', 'search_index'])
     else:
-        print(f"⚠️  Файл {json_file} не найден")
+        print(f"⚠️  Не удалось извлечь синтаксис из {zip_file}")
+
+# Вклад признаков заполненности в оценку важности для каждой из 16 комбинаций битов
+# score_flags: синтаксис (5), параметры (3), пример (1), описание (1)
+SCORE_TABLE = [
+    (5 if flags & 1 else 0) + (3 if flags & 2 else 0) + (1 if flags & 4 else 0) + (1 if flags & 8 else 0)
+    for flags in range(16)
+]
+
+def score_context_item(item):
+    """Оценивает важность элемента контекста для оптимизированной версии"""
+    metadata = item['metadata']
+    
+    # Признаки заполненности вычисляются конвертером; для старых файлов считаем на месте
+    flags = metadata.get('score_flags')
+    if flags is None:
+        from src.converters.base_converter import compute_score_flags
+        flags = compute_score_flags(metadata, item['content'])
+    
+    # Наличие методов (высокий вес) + табличный вклад остальных признаков
+    methods = metadata.get('methods')
+    return (len(methods) * 10 if methods else 0) + SCORE_TABLE[flags]
 
 def create_optimized_version():
     """Создает оптимизированную версию из полного контекста"""
-    
-    print("Загружаем полный контекст...")
-    try:
-        with open('data/1c_context.json', 'r', encoding='utf-8') as f:
-            full_data = json.load(f)
-        print(f"Загружено {len(full_data['context_items'])} элементов")
-    except FileNotFoundError:
-        print("❌ Файл data/1c_context.json не найден!")
-        print("Сначала создайте полную версию: python run.py --full")
-        return
-    except Exception as e:
-        print(f"❌ Ошибка загрузки: {e}")
-        return
+    from src.converters.base_converter import iter_json_items, dump_json
     
     # Приоритеты категорий (высокий -> низкий)
     priorities = {
@@ -122,62 +141,55 @@ def create_optimized_version():
         'properties': 20     # Топ-20 свойств
     }
     
-    # Группируем элементы по категориям
-    categories = {}
-    for item in full_data['context_items']:
-        category = item['category']
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(item)
+    # Читаем элементы потоком и сразу отбираем топ по важности в каждой категории.
+    # В памяти держатся только кучи размером с лимит категории, а не весь файл.
+    # Ключ (оценка, -порядковый номер) сохраняет исходный порядок при равных оценках.
+    print("Загружаем полный контекст...")
+    category_counts = defaultdict(int)
+    category_heaps = defaultdict(list)
+    total_items = 0
+    try:
+        for item in iter_json_items('data/1c_context.json', 'context_items.item'):
+            category = item['category']
+            category_counts[category] += 1
+            
+            heap = category_heaps[category]
+            entry = (score_context_item(item), -total_items, item)
+            if len(heap) < limits.get(category, 100):
+                heapq.heappush(heap, entry)
+            elif heap and entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            
+            total_items += 1
+        print(f"Загружено {total_items} элементов")
+    except FileNotFoundError:
+        print("❌ Файл data/1c_context.json не найден!")
+        print("Сначала создайте полную версию: python run.py --full")
+        return
+    except Exception as e:
+        print(f"❌ Ошибка загрузки: {e}")
+        return
     
     print("Группировка по категориям:")
-    for category, items in categories.items():
-        print(f"  {category}: {len(items)} элементов")
+    for category, count in category_counts.items():
+        print(f"  {category}: {count} элементов")
     
     # Сортируем категории по приоритету
-    sorted_categories = sorted(categories.keys(), key=lambda x: priorities.get(x, 999))
+    sorted_categories = sorted(category_counts.keys(), key=lambda x: priorities.get(x, 999))
     
     optimized_items = []
+    kept_categories = []
     
     for category in sorted_categories:
-        items = categories[category]
         limit = limits.get(category, 100)
         
         print(f"Обрабатываем категорию: {category} (лимит: {limit} элементов)")
         
-        # Сортируем элементы по важности
-        scored_items = []
-        for item in items:
-            score = 0
-            
-            # Наличие методов (высокий вес)
-            if item['metadata'].get('methods'):
-                score += len(item['metadata']['methods']) * 10
-                
-            # Наличие синтаксиса (средний вес)
-            if item['metadata'].get('syntax') or item['metadata'].get('syntax_variants'):
-                score += 5
-                
-            # Наличие параметров (средний вес)
-            if item['metadata'].get('parameters') or item['metadata'].get('parameters_by_variant'):
-                score += 3
-                
-            # Наличие примеров (низкий вес)
-            if item['metadata'].get('example'):
-                score += 1
-                
-            # Наличие описания (базовый вес)
-            if item['content']:
-                score += 1
-                
-            scored_items.append((item, score))
-        
-        # Сортируем по убыванию важности
-        scored_items.sort(key=lambda x: x[1], reverse=True)
-        
-        # Берем топ элементы
-        top_items = [item for item, score in scored_items[:limit]]
+        # Разворачиваем кучу в порядке убывания важности
+        top_items = [item for _, _, item in sorted(category_heaps[category], reverse=True)]
         optimized_items.extend(top_items)
+        if top_items:
+            kept_categories.append(category)
         
         print(f"  Выбрано {len(top_items)} элементов")
     
@@ -187,45 +199,43 @@ def create_optimized_version():
             'source': '1C BSL Documentation (Optimized)',
             'generated_at': datetime.now().isoformat(),
             'total_items': len(optimized_items),
-            'categories': list(set(item['category'] for item in optimized_items)),
+            'categories': kept_categories,
             'optimization': 'Приоритетные элементы с лимитами по категориям',
-            'original_size': len(full_data['context_items']),
-            'compression_ratio': f"{len(optimized_items) / len(full_data['context_items']) * 100:.1f}%"
+            'original_size': total_items,
+            'compression_ratio': f"{len(optimized_items) / total_items * 100:.1f}%"
         },
         'context_items': optimized_items
     }
     
     # Сохраняем оптимизированную версию
     output_file = 'data/1c_context_optimized.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(optimized_data, f, ensure_ascii=False, indent=2)
+    dump_json(optimized_data, output_file)
     
     print(f"\n=== Оптимизация завершена ===")
-    print(f"Исходный размер: {len(full_data['context_items'])} элементов")
+    print(f"Исходный размер: {total_items} элементов")
     print(f"Оптимизированный размер: {len(optimized_items)} элементов")
-    print(f"Степень сжатия: {len(optimized_items) / len(full_data['context_items']) * 100:.1f}%")
+    print(f"Степень сжатия: {len(optimized_items) / total_items * 100:.1f}%")
     print(f"Файл сохранен: {output_file}")
     
     # Проверяем, что файл создался
-    if os.path.exists(output_file):
-        file_size = os.path.getsize(output_file) / 1024 / 1024
+    try:
+        file_size = Path(output_file).stat().st_size / 1024 / 1024
         print(f"Размер файла: {file_size:.2f} MB")
-    else:
+    except FileNotFoundError:
         print("ОШИБКА: Файл не создался!")
     
-    # Создаем текстовую версию
-    content = "# Оптимизированная документация синтаксиса 1С (BSL)\n\n"
-    content += "Этот файл содержит приоритетные элементы документации по синтаксису языка 1С:Предприятие.\n"
-    content += "Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n"
-    content += "=" * 80 + "\n\n"
-    
-    for item in optimized_items:
-        content += item['content']
-        content += "\n\n" + "=" * 80 + "\n\n"
-    
+    # Создаем текстовую версию, записывая элементы в файл по мере обхода
+    separator = "\n\n" + "=" * 80 + "\n\n"
     txt_file = 'data/1c_context_optimized.txt'
-    with open(txt_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    with open(txt_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write("# Оптимизированная документация синтаксиса 1С (BSL)\n\n")
+        f.write("Этот файл содержит приоритетные элементы документации по синтаксису языка 1С:Предприятие.\n")
+        f.write("Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n")
+        f.write("=" * 80 + "\n\n")
+        
+        for item in optimized_items:
+            f.write(item['content'])
+            f.write(separator)
     
     print(f"Текстовая версия сохранена: {txt_file}")
 
@@ -360,7 +370,8 @@ def main():
     # Интерактивный режим (когда нет других аргументов)
     else:
         # Проверка зависимостей для интерактивного режима
-        check_dependencies()
+        if not check_dependencies():
+            return
         
         print("\n🎯 Выберите действие:")
         print("1. Обработать документацию (shcntx_ru.zip) - первые 500 файлов")
@@ -5,7 +5,33 @@
 __version__ = "1.1.0"
 __author__ = "1C Help Parser Team"
 
-# Основные модули
-from .parsers import *
-from .converters import *
-from .demos import * 
\ No newline at end of file
+import importlib
+
+# Основные модули загружаются лениво (PEP 562): импорт src.* не тянет за собой
+# bs4/lxml и демонстрации, пока соответствующий класс действительно не нужен
+_LAZY_EXPORTS = {
+    'BaseParser': '.parsers',
+    'HBKParser': '.parsers',
+    'BSLSyntaxExtractor': '.parsers',
+    'BaseConverter': '.converters',
+    'ContextConverter': '.converters',
+    'OptimizedContextConverter': '.converters',
+    'SplitConverter': '.converters',
+    'MaxSplitConverter': '.converters',
+    'OptimizedSplitConverter': '.converters',
+    'LLMContextDemo': '.demos',
+    'OptimizedContextDemo': '.demos',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,7 +2,7 @@
 Модуль конвертеров для преобразования данных в LLM контекст
 """
 
-from .base_converter import BaseConverter
+from .base_converter import BaseConverter, ContextItem
 from .context_converter import ContextConverter
 from .optimized_context_converter import OptimizedContextConverter
 from .split_converter import SplitConverter
@@ -11,6 +11,7 @@ from .optimized_split_converter import OptimizedSplitConverter
 
 __all__ = [
     'BaseConverter', 
+    'ContextItem',
     'ContextConverter', 
     'OptimizedContextConverter',
     'SplitConverter',
@@ -9,10 +9,225 @@ import json
 import os
 import sys
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Iterable, Tuple, Union
 from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Ошибки чтения и разбора входного JSON (включая обрыв файла при потоковом разборе через ijson)
+JSON_LOAD_ERRORS = (OSError, ValueError) + ((ijson.JSONError,) if ijson is not None else ())
+
+# Регулярные выражения, компилируемые один раз при загрузке модуля
+_TAG_RE = re.compile(r'<[^>]+>')
+# Слова поискового индекса: короткие (до двух символов) отсекаются самим выражением
+_INDEX_WORD_RE = re.compile(r'\b\w{3,}\b')
+
+# Признак того, что clean_text изменит строку: пробельный символ кроме одиночного пробела,
+# двойной пробел, пробел по краям или начало HTML-тега
+_NEEDS_CLEAN_RE = re.compile(r'[^\S ]| {2}|^ | $|<')
+
+# Биты признаков заполненности элемента контекста (metadata['score_flags'])
+SCORE_FLAG_SYNTAX = 1
+SCORE_FLAG_PARAMETERS = 2
+SCORE_FLAG_EXAMPLE = 4
+SCORE_FLAG_CONTENT = 8
+
+def compute_score_flags(metadata: Dict[str, Any], content: str) -> int:
+    """Упаковывает наличие синтаксиса, параметров, примера и описания в битовую маску"""
+    flags = 0
+    if metadata.get('syntax') or metadata.get('syntax_variants'):
+        flags |= SCORE_FLAG_SYNTAX
+    if metadata.get('parameters') or metadata.get('parameters_by_variant'):
+        flags |= SCORE_FLAG_PARAMETERS
+    if metadata.get('example'):
+        flags |= SCORE_FLAG_EXAMPLE
+    if content:
+        flags |= SCORE_FLAG_CONTENT
+    return flags
+
+@dataclass
+class ContextItem:
+    """Элемент контекста LLM.
+    
+    Хранится в __slots__ вместо отдельного dict на каждый элемент; в JSON выгружается через to_dict().
+    """
+    __slots__ = ('id', 'title', 'category', 'content', 'metadata')
+    
+    id: str
+    title: str
+    category: str
+    content: str
+    metadata: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает элемент в виде словаря для сериализации"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'category': self.category,
+            'content': self.content,
+            'metadata': self.metadata
+        }
+
+def load_json(filename: str) -> Any:
+    """Загружает JSON файл (через orjson, если он установлен)"""
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_json_items(filename: str, prefix: str) -> Iterator[Any]:
+    """Последовательно выдает элементы массива по пути prefix в нотации ijson (например, 'context_items.item').
+    
+    Если ijson установлен, файл разбирается потоком без загрузки целиком в память.
+    """
+    if ijson is not None:
+        with open(filename, 'rb') as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+    
+    data = load_json(filename)
+    for key in prefix.split('.')[:-1]:
+        data = data[key]
+    yield from data
+
+def iter_json_kvitems(filename: str, prefix: str = '') -> Iterator[tuple]:
+    """Последовательно выдает пары (ключ, значение) объекта по пути prefix в нотации ijson.
+    
+    Если ijson установлен, в памяти одновременно находится только одно значение.
+    """
+    if ijson is not None:
+        with open(filename, 'rb') as f:
+            yield from ijson.kvitems(f, prefix, use_float=True)
+        return
+    
+    data = load_json(filename)
+    for key in filter(None, prefix.split('.')):
+        data = data[key]
+    yield from data.items()
+
+def _build_json_value(events: Iterator[tuple]) -> Any:
+    """Собирает одно JSON-значение из потока событий ijson.basic_parse"""
+    builder = ijson.ObjectBuilder()
+    depth = 0
+    for event, value in events:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+        if depth == 0:
+            return builder.value
+
+def _iter_json_map_items(events: Iterator[tuple]) -> Iterator[tuple]:
+    """Выдает пары (ключ, значение) вложенного объекта из потока событий ijson.basic_parse"""
+    next(events)  # start_map
+    for event, value in events:
+        if event == 'end_map':
+            return
+        yield value, _build_json_value(events)
+
+def iter_json_nested_kvitems(filename: str) -> Iterator[tuple]:
+    """Для объекта вида {ключ: {вложенный ключ: значение}} выдает пары (ключ, итератор пар вложенного объекта).
+    
+    Если ijson установлен, значения вложенных объектов разбираются по одному. Как и в itertools.groupby,
+    итератор действителен только до перехода к следующему ключу.
+    """
+    if ijson is None:
+        for key, value in load_json(filename).items():
+            yield key, iter(value.items())
+        return
+    
+    with open(filename, 'rb') as f:
+        events = ijson.basic_parse(f, use_float=True)
+        for event, value in events:
+            if event == 'map_key':
+                items = _iter_json_map_items(events)
+                yield value, items
+                # Дочитываем то, что потребитель не выбрал, чтобы не сбить разбор верхнего уровня
+                deque(items, maxlen=0)
+
+def dump_json(data: Any, filename: str) -> Tuple[int, int]:
+    """Сохраняет данные в JSON файл с отступами (через orjson, если он установлен).
+    
+    Возвращает размер файла в байтах и число строк: текст уже в памяти, поэтому
+    для проверки лимитов файл не нужно перечитывать.
+    """
+    if orjson is not None:
+        encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        encoded = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(encoded)
+    # Документ не заканчивается переводом строки, поэтому строк на одну больше, чем '\n'
+    return len(encoded), encoded.count(b'\n') + 1 if encoded else 0
+
+def dumps_json(data: Any) -> str:
+    """Сериализует данные в компактную JSON-строку (через orjson, если он установлен)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def _encode_json(data: Any, indent: int) -> str:
+    """Сериализует значение с отступом 2 и сдвигает все его строки, кроме первой, на indent пробелов"""
+    if orjson is not None:
+        text = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    # Внутри JSON-строк переводы строк экранированы, поэтому сдвигать можно простой заменой
+    return text.replace('\n', '\n' + ' ' * indent) if indent else text
+
+def dump_json_stream(head: Dict[str, Any], key: str, items: Iterable[Any], filename: str) -> None:
+    """Сохраняет {**head, key: [*items]} в том же виде, что и dump_json, сериализуя массив по одному элементу.
+    
+    В памяти не собирается текст всего документа, поэтому пиковое потребление не растет с размером массива.
+    """
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write('{\n')
+        for name, value in head.items():
+            f.write(f"  {_encode_json(name, 0)}: {_encode_json(value, 2)},\n")
+        f.write(f"  {_encode_json(key, 0)}: [")
+        
+        separator = '\n    '
+        for item in items:
+            f.write(separator)
+            f.write(_encode_json(item, 4))
+            separator = ',\n    '
+        
+        # Пустой массив записывается как [] без переводов строк
+        f.write(']\n}' if separator == '\n    ' else '\n  ]\n}')
+
+def dump_ndjson(records: Iterable[Any], filename: str) -> None:
+    """Сохраняет записи в формате NDJSON: по одной компактной JSON-записи на строку.
+    
+    Файл читается построчно (for line in f: json.loads(line)) без загрузки всего массива в память.
+    """
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        for record in records:
+            f.write(dumps_json(record))
+            f.write('\n')
+
+def _write_json_export(export: tuple) -> Union[Tuple[int, int], Exception]:
+    """Записывает пару (данные, имя файла) в JSON; возвращает (размер, строки) или исключение вместо того, чтобы его выбросить"""
+    data, filename = export
+    try:
+        return dump_json(data, filename)
+    except Exception as e:
+        return e
+
 class BaseConverter(ABC):
     """Базовый класс для всех конвертеров"""
     
@@ -21,44 +236,105 @@ class BaseConverter(ABC):
         self.data = {}
         self.verbose = verbose
         self.exported_files = []  # Для группировки логов
+        self.written_stats = {}  # Имя файла -> (размер в байтах, число строк) для валидации без перечитывания
+        self._dirs_created = set()  # Каталоги, уже созданные этим конвертером
+        # Общая метка времени для всех файлов одной конвертации (обновляется в начале convert)
+        self._generated_at = datetime.now().isoformat()
     
     def load_data(self) -> bool:
         """Загружает данные из JSON файла"""
         try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
+            self.data = load_json(self.input_file)
             print(f"Загружено {len(self.data)} элементов данных")
             return True
         except Exception as e:
             print(f"Ошибка при загрузке данных: {e}")
             return False
     
+    def iter_data(self) -> Iterator[tuple]:
+        """Выдает пары (категория, элементы): из self.data, если данные уже есть, иначе потоком из файла"""
+        if self.data:
+            yield from self.data.items()
+            return
+        yield from iter_json_kvitems(self.input_file)
+    
+    def iter_category_items(self) -> Iterator[tuple]:
+        """Выдает пары (категория, итератор пар (заголовок, данные)); из файла элементы читаются по одному"""
+        if self.data:
+            for category, items in self.data.items():
+                yield category, iter(items.items())
+            return
+        yield from iter_json_nested_kvitems(self.input_file)
+    
     def clean_text(self, text: str) -> str:
         """Очищает текст от лишних символов и форматирования"""
         if not text:
             return ""
         
-        # Удаляем лишние пробелы и переносы строк
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
+        # Уже чистые строки возвращаем как есть, без пересборки
+        if not _NEEDS_CLEAN_RE.search(text):
+            return text
         
-        # Удаляем HTML-теги
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        return text
+        # Удаляем лишние пробелы и переносы строк (split/join работает в C быстрее регулярки), затем HTML-теги
+        return _TAG_RE.sub('', ' '.join(text.split()))
     
     def ensure_directory(self, filepath: str) -> None:
         """Создает директорию для файла, если она не существует"""
         directory = os.path.dirname(filepath)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
+        if directory:
+            self.ensure_directories((directory,))
+    
+    def ensure_directories(self, directories: Iterable[str]) -> None:
+        """Создает каталоги одним проходом; уже созданные этим конвертером повторно не проверяются"""
+        for directory in dict.fromkeys(directories):
+            if directory not in self._dirs_created:
+                os.makedirs(directory, exist_ok=True)
+                self._dirs_created.add(directory)
     
     def export_json(self, data: Dict[str, Any], filename: str) -> None:
         """Экспортирует данные в JSON файл"""
         try:
             self.ensure_directory(filename)
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.written_stats[filename] = dump_json(data, filename)
+            
+            # Сохраняем информацию о файле для группировки
+            self.exported_files.append(filename)
+            
+            # Выводим лог в зависимости от режима
+            if self.verbose:
+                print(f"Данные экспортированы в {filename}")
+        except Exception as e:
+            print(f"Ошибка при экспорте в JSON: {e}")
+    
+    def export_json_many(self, exports: List[tuple]) -> None:
+        """Экспортирует пары (данные, имя файла) в JSON файлы в пуле потоков.
+        
+        Запись на диск отпускает GIL, поэтому потоки перекрывают ожидание ввода-вывода;
+        журнал и список экспортированных файлов ведутся в исходном порядке.
+        """
+        # Каталоги создаются заранее в основном потоке, а не в каждой задаче записи
+        self.ensure_directories(os.path.dirname(filename) for _, filename in exports if os.path.dirname(filename))
+        
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (data, filename), result in zip(exports, executor.map(_write_json_export, exports)):
+                if isinstance(result, Exception):
+                    print(f"Ошибка при экспорте в JSON: {result}")
+                    continue
+                
+                self.written_stats[filename] = result
+                # Сохраняем информацию о файле для группировки
+                self.exported_files.append(filename)
+                
+                # Выводим лог в зависимости от режима
+                if self.verbose:
+                    print(f"Данные экспортированы в {filename}")
+    
+    def export_json_stream(self, head: Dict[str, Any], key: str, items: Iterable[Any], filename: str) -> None:
+        """Экспортирует данные в JSON файл, записывая массив items по ключу key поэлементно"""
+        try:
+            self.ensure_directory(filename)
+            dump_json_stream(head, key, items, filename)
             
             # Сохраняем информацию о файле для группировки
             self.exported_files.append(filename)
@@ -69,11 +345,26 @@ class BaseConverter(ABC):
         except Exception as e:
             print(f"Ошибка при экспорте в JSON: {e}")
     
+    def export_ndjson(self, records: Iterable[Any], filename: str) -> None:
+        """Экспортирует записи в NDJSON файл (одна JSON-запись на строку)"""
+        try:
+            self.ensure_directory(filename)
+            dump_ndjson(records, filename)
+            
+            # Сохраняем информацию о файле для группировки
+            self.exported_files.append(filename)
+            
+            # Выводим лог в зависимости от режима
+            if self.verbose:
+                print(f"Данные экспортированы в {filename}")
+        except Exception as e:
+            print(f"Ошибка при экспорте в NDJSON: {e}")
+    
     def export_text(self, data: str, filename: str) -> None:
         """Экспортирует данные в текстовый файл"""
         try:
             self.ensure_directory(filename)
-            with open(filename, 'w', encoding='utf-8') as f:
+            with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
                 f.write(data)
             
             # Сохраняем информацию о файле для группировки
@@ -104,51 +395,55 @@ class BaseConverter(ABC):
                 categories[category] = []
             categories[category].append(filename)
         
-        # Выводим сводку
-        print(f"📁 Экспортировано файлов: {len(self.exported_files)}")
+        # Собираем сводку построчно и выводим одной записью
+        lines = [f"📁 Экспортировано файлов: {len(self.exported_files)}"]
         for category, files in sorted(categories.items()):
-            print(f"   📂 {category}: {len(files)} файлов")
+            lines.append(f"   📂 {category}: {len(files)} файлов")
             
             # Показываем детали для малых категорий
             if len(files) <= 3:
                 for file in files:
                     filename = os.path.basename(file)
-                    print(f"      {filename}")
+                    lines.append(f"      {filename}")
             else:
                 # Показываем первые и последние файлы
                 for file in files[:2]:
                     filename = os.path.basename(file)
-                    print(f"      {filename}")
+                    lines.append(f"      {filename}")
                 if len(files) > 4:
-                    print(f"      ... ({len(files)-4} файлов) ...")
+                    lines.append(f"      ... ({len(files)-4} файлов) ...")
                 for file in files[-2:]:
                     filename = os.path.basename(file)
-                    print(f"      {filename}")
+                    lines.append(f"      {filename}")
+        
+        sys.stdout.write('\n'.join(lines) + '\n')
         
         # Очищаем список для следующего использования
         self.exported_files = []
     
-    def create_search_index(self, items: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    def create_search_index(self, items: List[ContextItem]) -> Dict[str, List[str]]:
         """Создает поисковый индекс по ключевым словам"""
-        search_index = {}
+        # dict используется как упорядоченное множество: проверка за O(1),
+        # при этом id сохраняют порядок первого появления
+        search_index = defaultdict(dict)
         
         for item in items:
-            # Извлекаем ключевые слова из заголовка и содержимого
-            title = item.get('title', '').lower()
-            content = item.get('content', '').lower()
+            item_id = item.id
             
-            # Разбиваем на слова
-            words = re.findall(r'\b\w+\b', f"{title} {content}")
+            # Извлекаем уникальные слова (в порядке появления) из заголовка и содержимого,
+            # чтобы каждая пара (слово, id) попадала в индекс один раз; в нижний регистр
+            # переводятся только найденные слова, а не весь текст
+            words = dict.fromkeys(
+                word.lower()
+                for text in (item.title, item.content)
+                for word in _INDEX_WORD_RE.findall(text)
+            )
             
             # Добавляем в индекс
             for word in words:
-                if len(word) > 2:  # Игнорируем короткие слова
-                    if word not in search_index:
-                        search_index[word] = []
-                    if item.get('id') not in search_index[word]:
-                        search_index[word].append(item.get('id'))
+                search_index[word][item_id] = None
         
-        return search_index
+        return {word: list(ids) for word, ids in search_index.items()}
     
     @abstractmethod
     def convert(self) -> None:
@@ -9,12 +9,23 @@ import os
 import sys
 import re
 import json
+from collections import Counter, defaultdict
+from itertools import chain
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 try:
-    from .base_converter import BaseConverter
+    from .base_converter import BaseConverter, ContextItem, JSON_LOAD_ERRORS, compute_score_flags, dump_json, dumps_json
 except ImportError:
-    from base_converter import BaseConverter
+    from base_converter import BaseConverter, ContextItem, JSON_LOAD_ERRORS, compute_score_flags, dump_json, dumps_json
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+# Регулярное выражение для разбиения заголовков на слова
+_WORD_RE = re.compile(r'\b\w+\b')
 
 class ContextConverter(BaseConverter):
     """Конвертер документации 1С в формат context для LLM"""
@@ -22,104 +33,169 @@ class ContextConverter(BaseConverter):
     def __init__(self, syntax_file: str):
         super().__init__(syntax_file)
         self.context_data = []
+        # Категории элементов контекста в порядке появления (dict как упорядоченное множество)
+        self._categories_seen = {}
+    
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> 'ContextConverter':
+        """Создает конвертер из уже извлеченных данных синтаксиса, минуя промежуточный JSON"""
+        converter = cls('')
+        converter.data = data
+        return converter
     
-    def format_for_context(self, title: str, info: Dict[str, Any], category: str) -> Dict[str, Any]:
+    def format_for_context(self, title: str, info: Dict[str, Any], category: str) -> ContextItem:
         """Форматирует информацию для контекста LLM"""
-        context_item = {
-            'id': f"{category}_{len(self.context_data)}",
-            'title': title,
-            'category': category,
-            'content': '',
-            'metadata': {
-                'filename': info.get('filename', ''),
-                'syntax': info.get('syntax', ''),
-                'syntax_variants': info.get('syntax_variants', []),
-                'parameters': info.get('parameters', []),
-                'parameters_by_variant': info.get('parameters_by_variant', {}),
-                'return_value': info.get('return_value', ''),
-                'example': info.get('example', ''),
-                'links': info.get('links', []),
-                'collection_elements': info.get('collection_elements', {}),
-                'methods': info.get('methods', []),
-                'availability': info.get('availability', []),
-                'version': info.get('version', '')
-            }
+        metadata = {
+            'filename': info.get('filename', ''),
+            'syntax': info.get('syntax', ''),
+            'syntax_variants': info.get('syntax_variants', []),
+            'parameters': info.get('parameters', []),
+            'parameters_by_variant': info.get('parameters_by_variant', {}),
+            'return_value': info.get('return_value', ''),
+            'example': info.get('example', ''),
+            'links': info.get('links', []),
+            'collection_elements': info.get('collection_elements', {}),
+            'methods': info.get('methods', []),
+            'availability': info.get('availability', []),
+            'version': info.get('version', '')
         }
         
         # Формируем основной контент - только описание
         if info.get('description'):
-            context_item['content'] = super().clean_text(info['description'])
+            content = super().clean_text(info['description'])
         else:
-            context_item['content'] = ""
-        return context_item
+            content = ""
+        
+        # Признаки заполненности для быстрой оценки важности при оптимизации
+        metadata['score_flags'] = compute_score_flags(metadata, content)
+        return ContextItem(f"{category}_{len(self.context_data)}", title, category, content, metadata)
     
-    def convert_to_context(self) -> List[Dict[str, Any]]:
+    def convert_to_context(self) -> List[ContextItem]:
         """Конвертирует данные синтаксиса в формат context"""
         print("Конвертация в формат context...")
         
-        if not self.load_data():
-            return []
+        # Состояние до разбора: при ошибке чтения частично прочитанные элементы откатываются
+        start = len(self.context_data)
+        categories_seen = dict(self._categories_seen)
         
-        for category, items in self.data.items():
+        # Данные могут быть переданы напрямую через from_data, иначе категории читаются из файла по одной.
+        # Ошибки чтения ловятся только вокруг получения очередной категории, а не вокруг форматирования
+        categories = self.iter_data()
+        while True:
+            try:
+                category, items = next(categories)
+            except StopIteration:
+                break
+            except JSON_LOAD_ERRORS as e:
+                print(f"Ошибка при загрузке данных: {e}")
+                del self.context_data[start:]
+                self._categories_seen = categories_seen
+                return []
+            
             print(f"Обрабатываем категорию: {category} ({len(items)} элементов)")
             
+            # Записи с ошибками отбрасываются еще при извлечении; здесь лишь страховка для правленых вручную файлов
             for title, info in items.items():
-                if isinstance(info, dict) and not info.get('error'):
+                if type(info) is dict and 'error' not in info:
                     context_item = self.format_for_context(title, info, category)
                     self.context_data.append(context_item)
+                    self._categories_seen[category] = None
         
         print(f"Создано {len(self.context_data)} элементов контекста")
         return self.context_data
     
+    def _context_metadata(self) -> Dict[str, Any]:
+        """Метаданные экспорта контекста (общие для JSON и NDJSON)"""
+        return {
+            'source': '1C BSL Documentation',
+            'generated_at': self._generated_at,
+            'total_items': len(self.context_data),
+            'categories': list(self._categories_seen)
+        }
+    
     def export_context_json(self, filename: str) -> None:
         """Экспортирует контекст в JSON формат"""
-        context_export = {
-            'metadata': {
-                'source': '1C BSL Documentation',
-                'generated_at': datetime.now().isoformat(),
-                'total_items': len(self.context_data),
-                'categories': list(set(item['category'] for item in self.context_data))
-            },
-            'context_items': self.context_data
-        }
+        head = {'metadata': self._context_metadata()}
         
-        self.export_json(context_export, filename)
+        # Элементы сериализуются по одному, без текста всего документа в памяти
+        self.export_json_stream(head, 'context_items', (item.to_dict() for item in self.context_data), filename)
+    
+    def export_context_ndjson(self, filename: str) -> None:
+        """Экспортирует контекст в NDJSON: первая строка - {"metadata": ...}, далее по элементу на строку"""
+        records = chain(({'metadata': self._context_metadata()},), (item.to_dict() for item in self.context_data))
+        self.export_ndjson(records, filename)
     
     def export_context_text(self, filename: str) -> None:
         """Экспортирует контекст в текстовый формат для LLM"""
-        content = "# Документация синтаксиса 1С (BSL)\n\n"
-        content += "Этот файл содержит документацию по синтаксису языка 1С:Предприятие.\n"
-        content += "Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n"
-        content += "=" * 80 + "\n\n"
+        separator = "\n\n" + "=" * 80 + "\n\n"
+        parts = [
+            "# Документация синтаксиса 1С (BSL)\n\n",
+            "Этот файл содержит документацию по синтаксису языка 1С:Предприятие.\n",
+            "Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n",
+            "=" * 80 + "\n\n"
+        ]
         
         for item in self.context_data:
-            content += item['content']
-            content += "\n\n" + "=" * 80 + "\n\n"
+            parts.append(item.content)
+            parts.append(separator)
         
-        self.export_text(content, filename)
+        self.export_text(''.join(parts), filename)
     
     def export_context_chunks(self, chunk_size: int = 1000, output_dir: str = "data/context_chunks") -> None:
         """Экспортирует контекст в отдельные файлы-чанки"""
         os.makedirs(output_dir, exist_ok=True)
         
         # Группируем по категориям
-        categories = {}
+        categories = defaultdict(list)
         for item in self.context_data:
-            category = item['category']
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(item)
+            categories[item.category].append(item)
+        
+        separator = "\n\n" + "-" * 60 + "\n\n"
         
         # Создаем файлы для каждой категории
         for category, items in categories.items():
             filename = os.path.join(output_dir, f"{category}_context.txt")
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(f"# Документация 1С: {category.title()}\n\n")
-                
-                for item in items:
-                    f.write(item['content'])
-                    f.write("\n\n" + "-" * 60 + "\n\n")
+            lines = [f"# Документация 1С: {category.title()}\n\n"]
+            for item in items:
+                lines.append(item.content)
+                lines.append(separator)
+            
+            # Крупный буфер: чанк уходит на диск несколькими большими записями
+            with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.writelines(lines)
+            
+            print(f"Создан файл: {filename} ({len(items)} элементов)")
+    
+    def export_context_arrow(self, output_dir: str = "data/context_arrow") -> None:
+        """Экспортирует контекст в файлы Arrow IPC по категориям (требуется pyarrow).
+        
+        Файл открывается без копирования в память через
+        pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all(); метаданные элемента
+        хранятся в колонке metadata как JSON-строка.
+        """
+        if pyarrow is None:
+            print("Для экспорта в Arrow установите pyarrow: pip install pyarrow")
+            return
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Группируем по категориям
+        categories = defaultdict(list)
+        for item in self.context_data:
+            categories[item.category].append(item)
+        
+        for category, items in categories.items():
+            filename = os.path.join(output_dir, f"{category}_context.arrow")
+            table = pyarrow.table({
+                'id': [item.id for item in items],
+                'title': [item.title for item in items],
+                'content': [item.content for item in items],
+                'metadata': [dumps_json(item.metadata) for item in items]
+            })
+            
+            with pyarrow.ipc.new_file(filename, table.schema) as writer:
+                writer.write_table(table)
             
             print(f"Создан файл: {filename} ({len(items)} элементов)")
     
@@ -128,7 +204,7 @@ class ContextConverter(BaseConverter):
         search_index = {
             'metadata': {
                 'source': '1C BSL Documentation',
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': self._generated_at,
                 'total_items': len(self.context_data)
             },
             'index': super().create_search_index(self.context_data)
@@ -139,6 +215,7 @@ class ContextConverter(BaseConverter):
     def convert(self, output_formats: List[str] = None) -> None:
         """Основной метод конвертации"""
         print("Начинаем конвертацию документации 1С...")
+        self._generated_at = datetime.now().isoformat()
         
         # Конвертируем в контекст
         self.convert_to_context()
@@ -155,12 +232,18 @@ class ContextConverter(BaseConverter):
         if 'json' in output_formats:
             self.export_context_json("data/1c_context.json")
         
+        if 'ndjson' in output_formats:
+            self.export_context_ndjson("data/1c_context.ndjson")
+        
         if 'txt' in output_formats:
             self.export_context_text("data/1c_context.txt")
         
         if 'chunks' in output_formats:
             self.export_context_chunks()
         
+        if 'arrow' in output_formats:
+            self.export_context_arrow()
+        
         if 'search_index' in output_formats:
             self.create_search_index("data/1c_search_index.json")
         
@@ -174,7 +257,7 @@ class ContextConverter(BaseConverter):
         summary = {
             'metadata': {
                 'source': '1C BSL Documentation',
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': self._generated_at,
                 'total_items': len(self.context_data)
             },
             'categories': {},
@@ -183,34 +266,25 @@ class ContextConverter(BaseConverter):
         }
         
         # Статистика по категориям
-        for item in self.context_data:
-            category = item['category']
-            if category not in summary['categories']:
-                summary['categories'][category] = 0
-            summary['categories'][category] += 1
+        summary['categories'] = dict(Counter(item.category for item in self.context_data))
         
         # Собираем ключевые слова
-        keywords = {}
+        keywords = Counter()
         for item in self.context_data:
-            words = re.findall(r'\b\w+\b', item['title'].lower())
-            for word in words:
-                if len(word) > 3:
-                    keywords[word] = keywords.get(word, 0) + 1
+            keywords.update(word for word in _WORD_RE.findall(item.title.lower()) if len(word) > 3)
         
         # Топ-20 ключевых слов
-        top_keywords = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:20]
-        summary['top_keywords'] = dict(top_keywords)
+        summary['top_keywords'] = dict(keywords.most_common(20))
         
         # Собираем примеры
         for item in self.context_data:
-            if item['metadata']['syntax']:
+            if item.metadata['syntax']:
                 summary['examples'].append({
-                    'title': item['title'],
-                    'syntax': item['metadata']['syntax']
+                    'title': item.title,
+                    'syntax': item.metadata['syntax']
                 })
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        dump_json(summary, filename)
         
         print(f"Резюме создано: {filename}")
 
@@ -218,7 +292,7 @@ def main():
     """Основная функция"""
     if len(sys.argv) < 2:
         print("Использование: python context_converter.py <путь_к_bsl_syntax.json> [форматы]")
-        print("Форматы: json, txt, chunks, search_index, summary (по умолчанию: json,txt,search_index)")
+        print("Форматы: json, ndjson, txt, chunks, arrow, search_index, summary (по умолчанию: json,txt,search_index)")
         sys.exit(1)
     
     syntax_file = sys.argv[1]
@@ -241,10 +315,14 @@ def main():
     print("Созданные файлы:")
     if 'json' in output_formats:
         print("- 1c_context.json - структурированный контекст")
+    if 'ndjson' in output_formats:
+        print("- 1c_context.ndjson - контекст построчно (NDJSON)")
     if 'txt' in output_formats:
         print("- 1c_context.txt - текстовый контекст для LLM")
     if 'chunks' in output_formats:
         print("- context_chunks/ - файлы по категориям")
+    if 'arrow' in output_formats:
+        print("- context_arrow/ - файлы Arrow IPC по категориям")
     if 'search_index' in output_formats:
         print("- 1c_search_index.json - поисковый индекс")
     if 'summary' in output_formats:
@@ -5,9 +5,9 @@
 Все элементы документации разбиваются на множественные файлы
 """
 
-import os
 import sys
 from typing import Dict, List, Any
+from datetime import datetime
 from .split_converter import SplitConverter
 
 class MaxSplitConverter(SplitConverter):
@@ -18,9 +18,10 @@ class MaxSplitConverter(SplitConverter):
         if not self.load_data():
             print("❌ Не удалось загрузить данные")
             return
+        self._generated_at = datetime.now().isoformat()
         
         output_dir = "data/max_split"
-        os.makedirs(output_dir, exist_ok=True)
+        self.ensure_directories([output_dir])
         
         # Получаем все элементы
         all_items = self.data.get("context_items", [])
@@ -43,15 +44,14 @@ class MaxSplitConverter(SplitConverter):
     
     def show_statistics(self, output_dir: str, all_items: List[Dict]):
         """Показывает статистику созданных файлов"""
-        categories = self.split_by_category(all_items)
+        categories = self.plan_split(all_items)
         
         print(f"\n📈 Статистика экспорта:")
         print(f"   Всего элементов: {len(all_items)}")
         print(f"   Категорий: {len(categories)}")
         
         total_files = 0
-        for category, items in categories.items():
-            chunks = self.split_into_chunks(items)
+        for category, (items, chunks) in categories.items():
             total_files += len(chunks)
             print(f"   {category}: {len(items)} элементов → {len(chunks)} файлов")
         
@@ -6,9 +6,16 @@
 
 import json
 import os
+import re
+import heapq
+from collections import defaultdict
+from itertools import chain, islice
 from datetime import datetime
-from typing import Dict, Any, List
-from .base_converter import BaseConverter
+from typing import Dict, Any, List, Iterable, Tuple
+from .base_converter import BaseConverter, ContextItem
+
+# Слова из букв длиной от 3 символов: короткие токены, цифры и пунктуация отсекаются в самом regex
+_KEYWORD_RE = re.compile(r'[^\W\d_]{3,}')
 
 class OptimizedContextConverter(BaseConverter):
     """Оптимизированный конвертер для создания компактной версии контекста"""
@@ -16,6 +23,8 @@ class OptimizedContextConverter(BaseConverter):
     def __init__(self, syntax_file: str):
         super().__init__(syntax_file)
         self.context_data = []
+        # Категории элементов контекста в порядке появления (dict как упорядоченное множество)
+        self._categories_seen = {}
         
     def convert(self, output_formats: List[str] = None) -> None:
         """Конвертирует данные в оптимизированный формат"""
@@ -24,16 +33,8 @@ class OptimizedContextConverter(BaseConverter):
             
         print("Начинаем конвертацию документации 1С...")
         print("Конвертация в оптимизированный формат...")
+        self._generated_at = datetime.now().isoformat()
         
-        # Загружаем данные напрямую из JSON файла
-        try:
-            with open(self.syntax_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
-            print(f"Загружено {sum(len(items) for items in self.data.values())} элементов")
-        except Exception as e:
-            print(f"Ошибка загрузки данных: {e}")
-            return
-            
         # Приоритеты категорий (высокий -> низкий)
         priorities = {
             'methods': 1,      # Высокий приоритет
@@ -52,22 +53,30 @@ class OptimizedContextConverter(BaseConverter):
             'properties': 20     # Топ-20 свойств
         }
         
+        # Читаем данные потоком: из каждой категории в памяти остаются только элементы, прошедшие лимит
+        selected = {}
+        total_items = 0
+        try:
+            for category, items in self.iter_category_items():
+                selected[category], count = self._sort_by_importance(items, limits.get(category, 100))
+                total_items += count
+            print(f"Загружено {total_items} элементов")
+        except Exception as e:
+            print(f"Ошибка загрузки данных: {e}")
+            return
+        
         # Сортируем категории по приоритету
-        sorted_categories = sorted(self.data.keys(), key=lambda x: priorities.get(x, 999))
+        sorted_categories = sorted(selected.keys(), key=lambda x: priorities.get(x, 999))
         
         for category in sorted_categories:
-            items = self.data[category]
             limit = limits.get(category, 100)
             
             print(f"Обрабатываем категорию: {category} (лимит: {limit} элементов)")
             
-            # Сортируем элементы по важности (наличие методов, синтаксиса и т.д.)
-            sorted_items = self._sort_by_importance(items, limit)
-            
-            for title, info in sorted_items:
-                if isinstance(info, dict) and not info.get('error'):
-                    context_item = self._format_for_context(title, info, category)
-                    self.context_data.append(context_item)
+            # Элементы уже отфильтрованы и отсортированы по важности (наличие методов, синтаксиса и т.д.)
+            for title, info in selected[category]:
+                self.context_data.append(self._format_for_context(title, info, category))
+                self._categories_seen[category] = None
         
         print(f"Создано {len(self.context_data)} оптимизированных элементов контекста")
         
@@ -75,6 +84,10 @@ class OptimizedContextConverter(BaseConverter):
         if 'json' in output_formats:
             self.export_context_json('data/1c_context_optimized.json')
             
+        if 'ndjson' in output_formats:
+            self.export_context_ndjson('data/1c_context_optimized.ndjson')
+            self.export_search_postings_ndjson('data/1c_search_postings_optimized.ndjson')
+            
         if 'txt' in output_formats:
             self.export_context_text('data/1c_context_optimized.txt')
             
@@ -83,142 +96,174 @@ class OptimizedContextConverter(BaseConverter):
             
         print("Конвертация завершена!")
         
-    def _sort_by_importance(self, items: Dict[str, Any], limit: int) -> List[tuple]:
-        """Сортирует элементы по важности"""
-        scored_items = []
+    def _sort_by_importance(self, items: Iterable[tuple], limit: int) -> Tuple[List[tuple], int]:
+        """Отбирает limit самых важных элементов из потока пар (заголовок, данные).
+        
+        Записи с ошибками отбрасываются до оценки и не занимают места в лимите.
+        Возвращает отобранные пары по убыванию важности (при равной важности - в исходном порядке)
+        и общее число просмотренных элементов. В памяти одновременно не больше limit элементов.
+        """
+        # Куча с минимальной важностью в вершине; -index сохраняет исходный порядок при равной важности
+        heap = []
+        count = 0
         
-        for title, info in items.items():
+        for index, (title, info) in enumerate(items):
+            count += 1
+            if type(info) is not dict or info.get('error'):
+                continue
+            
+            get = info.get
             score = 0
             
             # Наличие методов (высокий вес)
-            if info.get('methods'):
-                score += len(info['methods']) * 10
+            methods = get('methods')
+            if methods:
+                score += len(methods) * 10
                 
             # Наличие синтаксиса (средний вес)
-            if info.get('syntax') or info.get('syntax_variants'):
+            if get('syntax') or get('syntax_variants'):
                 score += 5
                 
             # Наличие параметров (средний вес)
-            if info.get('parameters') or info.get('parameters_by_variant'):
+            if get('parameters') or get('parameters_by_variant'):
                 score += 3
                 
             # Наличие примеров (низкий вес)
-            if info.get('example'):
+            if get('example'):
                 score += 1
                 
             # Наличие описания (базовый вес)
-            if info.get('description'):
+            if get('description'):
                 score += 1
-                
-            scored_items.append((title, info, score))
-        
-        # Сортируем по убыванию важности
-        scored_items.sort(key=lambda x: x[2], reverse=True)
+            
+            entry = (score, -index, title, info)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif heap and entry > heap[0]:
+                heapq.heapreplace(heap, entry)
         
-        # Возвращаем топ элементы
-        return [(title, info) for title, info, score in scored_items[:limit]]
+        # Возвращаем топ элементы по убыванию важности
+        return [(title, info) for score, _, title, info in sorted(heap, reverse=True)], count
         
-    def _format_for_context(self, title: str, info: Dict[str, Any], category: str) -> Dict[str, Any]:
+    def _format_for_context(self, title: str, info: Dict[str, Any], category: str) -> ContextItem:
         """Форматирует информацию для контекста"""
-        context_item = {
-            'id': f"{category}_{len(self.context_data)}",
-            'title': title,
-            'category': category,
-            'content': '',
-            'metadata': {
-                'filename': info.get('filename', ''),
-                'syntax': info.get('syntax', ''),
-                'syntax_variants': info.get('syntax_variants', []),
-                'parameters': info.get('parameters', []),
-                'parameters_by_variant': info.get('parameters_by_variant', {}),
-                'return_value': info.get('return_value', ''),
-                'example': info.get('example', ''),
-                'links': info.get('links', []),
-                'collection_elements': info.get('collection_elements', {}),
-                'methods': info.get('methods', []),
-                'availability': info.get('availability', []),
-                'version': info.get('version', '')
-            }
+        get = info.get
+        metadata = {
+            'filename': get('filename', ''),
+            'syntax': get('syntax', ''),
+            'syntax_variants': get('syntax_variants', []),
+            'parameters': get('parameters', []),
+            'parameters_by_variant': get('parameters_by_variant', {}),
+            'return_value': get('return_value', ''),
+            'example': get('example', ''),
+            'links': get('links', []),
+            'collection_elements': get('collection_elements', {}),
+            'methods': get('methods', []),
+            'availability': get('availability', []),
+            'version': get('version', '')
         }
         
         # Формируем основной контент - только описание
-        if info.get('description'):
-            context_item['content'] = super().clean_text(info['description'])
+        description = get('description')
+        if description:
+            content = super().clean_text(description)
         else:
-            context_item['content'] = ""
+            content = ""
             
-        return context_item
+        return ContextItem(f"{category}_{len(self.context_data)}", title, category, content, metadata)
+        
+    def _context_metadata(self) -> Dict[str, Any]:
+        """Метаданные экспорта контекста (общие для JSON и NDJSON)"""
+        return {
+            'source': '1C BSL Documentation (Optimized)',
+            'generated_at': self._generated_at,
+            'total_items': len(self.context_data),
+            'categories': list(self._categories_seen),
+            'optimization': 'Приоритетные элементы с лимитами по категориям'
+        }
         
     def export_context_json(self, filename: str) -> None:
         """Экспортирует контекст в JSON формат"""
-        context_export = {
-            'metadata': {
-                'source': '1C BSL Documentation (Optimized)',
-                'generated_at': datetime.now().isoformat(),
-                'total_items': len(self.context_data),
-                'categories': list(set(item['category'] for item in self.context_data)),
-                'optimization': 'Приоритетные элементы с лимитами по категориям'
-            },
-            'context_items': self.context_data
-        }
+        head = {'metadata': self._context_metadata()}
         
-        self.export_json(context_export, filename)
+        # Элементы сериализуются по одному, без текста всего документа в памяти
+        self.export_json_stream(head, 'context_items', (item.to_dict() for item in self.context_data), filename)
+        
+    def export_context_ndjson(self, filename: str) -> None:
+        """Экспортирует контекст в NDJSON: первая строка - {"metadata": ...}, далее по элементу на строку"""
+        records = chain(({'metadata': self._context_metadata()},), (item.to_dict() for item in self.context_data))
+        self.export_ndjson(records, filename)
         
     def export_context_text(self, filename: str) -> None:
         """Экспортирует контекст в текстовый формат для LLM"""
-        content = "# Оптимизированная документация синтаксиса 1С (BSL)\n\n"
-        content += "Этот файл содержит приоритетные элементы документации по синтаксису языка 1С:Предприятие.\n"
-        content += "Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n"
-        content += "=" * 80 + "\n\n"
+        separator = "\n\n" + "=" * 80 + "\n\n"
+        parts = [
+            "# Оптимизированная документация синтаксиса 1С (BSL)\n\n",
+            "Этот файл содержит приоритетные элементы документации по синтаксису языка 1С:Предприятие.\n",
+            "Используйте эту информацию для ответов на вопросы о программировании в 1С.\n\n",
+            "=" * 80 + "\n\n"
+        ]
         
         for item in self.context_data:
-            content += item['content']
-            content += "\n\n" + "=" * 80 + "\n\n"
+            parts.append(item.content)
+            parts.append(separator)
         
-        self.export_text(content, filename)
+        self.export_text(''.join(parts), filename)
         
     def create_search_index(self, filename: str) -> None:
         """Создает поисковый индекс для быстрого поиска"""
         search_index = {
             'metadata': {
                 'source': '1C BSL Documentation (Optimized)',
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': self._generated_at,
                 'total_items': len(self.context_data)
             },
-            'search_data': []
+            'docs': [{'id': item.id, 'title': item.title, 'category': item.category} for item in self.context_data],
+            'postings': self._build_postings()
         }
         
-        for item in self.context_data:
-            search_item = {
-                'id': item['id'],
-                'title': item['title'],
-                'category': item['category'],
-                'content': item['content'],
-                'keywords': self._extract_keywords(item)
-            }
-            search_index['search_data'].append(search_item)
-        
         self.export_json(search_index, filename)
         
-    def _extract_keywords(self, item: Dict[str, Any]) -> List[str]:
-        """Извлекает ключевые слова из элемента"""
-        keywords = []
+    def export_search_postings_ndjson(self, filename: str) -> None:
+        """Экспортирует инвертированный индекс в NDJSON: строка {"metadata": ...}, далее {"t": слово, "p": [номера]}.
+        
+        Номера указывают на позиции элементов в context_items (и на строки элементов в NDJSON контекста).
+        """
+        metadata = {
+            'source': '1C BSL Documentation (Optimized)',
+            'generated_at': self._generated_at,
+            'total_items': len(self.context_data)
+        }
+        records = chain(({'metadata': metadata},),
+                        ({'t': term, 'p': ids} for term, ids in self._build_postings().items()))
+        self.export_ndjson(records, filename)
         
-        # Из заголовка
-        keywords.extend(item['title'].lower().split())
+    def _build_postings(self) -> Dict[str, List[int]]:
+        """Строит инвертированный индекс: ключевое слово -> номера элементов в context_data"""
+        postings = defaultdict(list)
+        for i, item in enumerate(self.context_data):
+            for keyword in self._extract_keywords(item):
+                postings[keyword].append(i)
+        
+        # Термины сортируются, чтобы соседние ключи сжимались лучше и файл был детерминированным
+        return {term: postings[term] for term in sorted(postings)}
+        
+    def _extract_keywords(self, item: ContextItem) -> List[str]:
+        """Извлекает ключевые слова из элемента"""
+        # dict как упорядоченное множество: дубликаты убираются, порядок появления сохраняется
+        keywords = dict.fromkeys(word.lower() for word in _KEYWORD_RE.findall(item.title))
         
         # Из контента
-        if item['content']:
-            keywords.extend(item['content'].lower().split())
+        if item.content:
+            keywords.update(dict.fromkeys(word.lower() for word in _KEYWORD_RE.findall(item.content)))
             
         # Из методов
-        for method in item['metadata'].get('methods', []):
-            keywords.append(method['name'].lower())
-            
-        # Убираем дубликаты и короткие слова
-        keywords = list(set([k for k in keywords if len(k) > 2]))
+        for method in item.metadata.get('methods', []):
+            name = method['name'].lower()
+            if len(name) > 2:
+                keywords[name] = None
         
-        return keywords[:20]  # Ограничиваем количество ключевых слов
+        return list(islice(keywords, 20))  # Ограничиваем количество ключевых слов
 
 def main():
     """Основная функция"""
@@ -5,9 +5,11 @@
 Приоритетные элементы разбиваются на множественные файлы
 """
 
-import os
 import sys
+import heapq
+from collections import Counter, defaultdict
 from typing import Dict, List, Any
+from datetime import datetime
 from .split_converter import SplitConverter
 
 class OptimizedSplitConverter(SplitConverter):
@@ -18,9 +20,10 @@ class OptimizedSplitConverter(SplitConverter):
         if not self.load_data():
             print("❌ Не удалось загрузить данные")
             return
+        self._generated_at = datetime.now().isoformat()
         
         output_dir = "data/optimized_split"
-        os.makedirs(output_dir, exist_ok=True)
+        self.ensure_directories([output_dir])
         
         # Получаем все элементы и применяем оптимизацию
         all_items = self.data.get("context_items", [])
@@ -65,21 +68,11 @@ class OptimizedSplitConverter(SplitConverter):
             'properties': 200
         }
         
-        # Сортируем элементы по важности
-        sorted_items = self._sort_by_importance(items)
+        # Отбираем самые важные элементы каждой категории в пределах лимитов
+        selected_items = self._sort_by_importance(items, limits)
         
-        # Выбираем элементы по лимитам
-        selected_items = []
-        category_counts = {}
-        
-        for item in sorted_items:
-            category = item.get('category', 'other')
-            if category not in category_counts:
-                category_counts[category] = 0
-            
-            if category_counts[category] < limits.get(category, 100):
-                selected_items.append(item)
-                category_counts[category] += 1
+        # Количество по категориям в порядке их первого появления среди отобранных
+        category_counts = Counter(item.get('category', 'other') for item in selected_items)
         
         print(f"✅ Оптимизация завершена: выбрано {len(selected_items)} элементов")
         for category, count in category_counts.items():
@@ -87,44 +80,63 @@ class OptimizedSplitConverter(SplitConverter):
         
         return selected_items
     
-    def _sort_by_importance(self, items: List[Dict]) -> List[Dict]:
-        """Сортирует элементы по важности"""
-        def score_item(item):
-            score = 0
-            metadata = item.get('metadata', {})
-            
-            # Методы и функции важнее
-            if item.get('category') in ['methods', 'functions']:
-                score += 100
-            
-            # Наличие синтаксиса
-            if metadata.get('syntax') or metadata.get('syntax_variants'):
-                score += 50
-            
-            # Наличие параметров
-            if metadata.get('parameters') or metadata.get('parameters_by_variant'):
-                score += 30
-            
-            # Наличие примеров
-            if metadata.get('example'):
-                score += 20
-            
-            # Наличие методов
-            if metadata.get('methods'):
-                score += len(metadata['methods']) * 10
-            
-            # Длина описания
-            content = item.get('content', '')
-            if len(content) > 50:
-                score += 10
-            
-            return score
-        
-        return sorted(items, key=score_item, reverse=True)
+    def _sort_by_importance(self, items: List[Dict], limits: Dict[str, int]) -> List[Dict]:
+        """Отбирает самые важные элементы каждой категории (не больше лимита категории, по умолчанию 100)
+        и возвращает их по убыванию важности; при равной важности сохраняется исходный порядок.
+        
+        Вместо полной сортировки для каждой категории за один проход ведется куча размером с ее лимит.
+        """
+        # Кучи с минимальной важностью в вершине; -index сохраняет исходный порядок при равной важности
+        heaps = defaultdict(list)
+        
+        for index, item in enumerate(items):
+            category = item.get('category', 'other')
+            heap = heaps[category]
+            entry = (self._score_item(item), -index, item)
+            if len(heap) < limits.get(category, 100):
+                heapq.heappush(heap, entry)
+            elif heap and entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        
+        selected = [entry for heap in heaps.values() for entry in heap]
+        selected.sort(reverse=True)
+        return [item for score, _, item in selected]
+    
+    def _score_item(self, item: Dict) -> int:
+        """Оценивает важность элемента"""
+        score = 0
+        metadata = item.get('metadata', {})
+        
+        # Методы и функции важнее
+        if item.get('category') in ['methods', 'functions']:
+            score += 100
+        
+        # Наличие синтаксиса
+        if metadata.get('syntax') or metadata.get('syntax_variants'):
+            score += 50
+        
+        # Наличие параметров
+        if metadata.get('parameters') or metadata.get('parameters_by_variant'):
+            score += 30
+        
+        # Наличие примеров
+        if metadata.get('example'):
+            score += 20
+        
+        # Наличие методов
+        if metadata.get('methods'):
+            score += len(metadata['methods']) * 10
+        
+        # Длина описания
+        content = item.get('content', '')
+        if len(content) > 50:
+            score += 10
+        
+        return score
     
     def show_statistics(self, output_dir: str, optimized_items: List[Dict], all_items: List[Dict]):
         """Показывает статистику созданных файлов"""
-        categories = self.split_by_category(optimized_items)
+        categories = self.plan_split(optimized_items)
         
         print(f"\n📈 Статистика экспорта:")
         print(f"   Исходных элементов: {len(all_items)}")
@@ -133,8 +145,7 @@ class OptimizedSplitConverter(SplitConverter):
         print(f"   Категорий: {len(categories)}")
         
         total_files = 0
-        for category, items in categories.items():
-            chunks = self.split_into_chunks(items)
+        for category, (items, chunks) in categories.items():
             total_files += len(chunks)
             print(f"   {category}: {len(items)} элементов → {len(chunks)} файлов")
         
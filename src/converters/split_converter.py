@@ -8,11 +8,34 @@
 import json
 import os
 import sys
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from typing import Dict, List, Any, Optional
-from datetime import datetime
 from .base_converter import BaseConverter
 from abc import abstractmethod
 
+# Кодировщик для оценки размера элемента: создается один раз, а не при каждом вызове json.dumps.
+# Размер считается по тем же правилам, что и раньше, поэтому границы чанков не меняются
+_SIZE_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+# Диапазоны для группировки предупреждений: верхние границы и названия (последний - без границы)
+_RANGE_BOUNDS = (60, 70, 80, 90)
+_RANGE_NAMES = ("50-60", "60-70", "70-80", "80-90", "90+")
+
+def _count_lines(file_path: str) -> int:
+    """Считает строки файла так же, как len(f.readlines()), но без списка строк в памяти"""
+    lines = 0
+    last = b''
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            lines += block.count(b'\n')
+            last = block
+    
+    # Последняя строка без перевода строки тоже считается
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    return lines
+
 class SplitConverter(BaseConverter):
     """Базовый класс для разбивки данных на множественные файлы"""
     
@@ -20,6 +43,10 @@ class SplitConverter(BaseConverter):
         super().__init__(input_file, verbose)
         self.max_file_size_kb = max_file_size_kb
         self.max_items_per_file = max_items_per_file
+        # Последняя разбивка: (список элементов, {категория: (элементы, чанки)})
+        self._split_plan = None
+        # Имена файлов чанков последнего экспорта: (список элементов, {категория: [имена файлов]})
+        self._written_layout = None
     
     def split_by_category(self, data: List[Dict]) -> Dict[str, List[Dict]]:
         """Разбивает данные по категориям"""
@@ -33,62 +60,91 @@ class SplitConverter(BaseConverter):
     
     def split_into_chunks(self, items: List[Dict]) -> List[List[Dict]]:
         """Разбивает элементы на чанки по размеру и количеству"""
-        chunks = []
-        current_chunk = []
-        current_size = 0
+        return self._pack_chunks(items, [len(_SIZE_ENCODER.encode(item)) for item in items])
+    
+    def _pack_chunks(self, items: List[Dict], sizes: List[int]) -> List[List[Dict]]:
+        """Жадно упаковывает элементы в чанки: чанк закрывается, если следующий элемент превысит
+        лимит размера или количества; элемент больше лимита размера попадает в отдельный чанк.
         
-        for item in items:
-            item_size = len(json.dumps(item, ensure_ascii=False))
-            
-            # Проверяем лимиты
-            if (len(current_chunk) >= self.max_items_per_file or 
-                current_size + item_size > self.max_file_size_kb * 1024):
-                if current_chunk:
-                    chunks.append(current_chunk)
-                    current_chunk = []
-                    current_size = 0
-            
-            current_chunk.append(item)
-            current_size += item_size
+        Границы находятся по префиксным суммам размеров двоичным поиском, поэтому цикл на Python
+        идет по чанкам, а не по элементам.
+        """
+        max_size = self.max_file_size_kb * 1024
+        prefix = [0, *accumulate(sizes)]
+        chunks = []
+        start = 0
         
-        if current_chunk:
-            chunks.append(current_chunk)
+        while start < len(items):
+            # Первая позиция, на которой суммарный размер от start превышает лимит
+            end = bisect_right(prefix, prefix[start] + max_size, start + 1) - 1
+            end = max(min(end, start + self.max_items_per_file), start + 1)
+            chunks.append(items[start:end])
+            start = end
         
         return chunks
     
+    def plan_split(self, data: List[Dict]) -> Dict[str, tuple]:
+        """Разбивает данные по категориям и чанкам: {категория: (элементы, чанки)}.
+        
+        Результат запоминается для того же списка data, поэтому экспорт, общий индекс и статистика
+        не сериализуют элементы повторно ради подсчета размеров.
+        """
+        if self._split_plan is not None and self._split_plan[0] is data:
+            return self._split_plan[1]
+        
+        # Раскладка по категориям с размерами элементов за один проход, затем упаковка каждой категории
+        grouped = {}
+        for item in data:
+            category = item.get('category', 'other')
+            if category not in grouped:
+                grouped[category] = ([], [])
+            items, sizes = grouped[category]
+            items.append(item)
+            sizes.append(len(_SIZE_ENCODER.encode(item)))
+        
+        plan = {category: (items, self._pack_chunks(items, sizes)) for category, (items, sizes) in grouped.items()}
+        
+        self._split_plan = (data, plan)
+        return plan
+    
     def export_split(self, data: List[Dict], output_dir: str, prefix: str = ""):
         """Экспортирует данные в разбитом виде"""
-        categories = self.split_by_category(data)
+        # Сначала собираем все файлы, затем записываем их пулом потоков
+        exports = []
+        plan = self.plan_split(data)
+        
+        # Все каталоги известны заранее: создаем их одним проходом
+        self.ensure_directories([output_dir, *(os.path.join(output_dir, category) for category in plan)])
         
-        for category, items in categories.items():
+        layout = {}
+        
+        for category, (items, chunks) in plan.items():
             category_dir = os.path.join(output_dir, category)
-            os.makedirs(category_dir, exist_ok=True)
-            
-            chunks = self.split_into_chunks(items)
+            name_prefix = f"{prefix}_{category}" if prefix else category
+            layout[category] = filenames = [f"{name_prefix}_{i:03d}.json" for i in range(1, len(chunks) + 1)]
             
-            for i, chunk in enumerate(chunks):
-                filename = f"{category}_{i+1:03d}.json"
-                if prefix:
-                    filename = f"{prefix}_{filename}"
-                
+            for i, (chunk, filename) in enumerate(zip(chunks, filenames)):
                 filepath = os.path.join(category_dir, filename)
-                self.export_json({"items": chunk, "metadata": {
+                exports.append(({"items": chunk, "metadata": {
                     "category": category,
                     "chunk": i+1,
                     "total_chunks": len(chunks),
                     "items_count": len(chunk),
-                    "created_at": datetime.now().isoformat()
-                }}, filepath)
+                    "created_at": self._generated_at
+                }}, filepath))
             
             # Создаем индекс для категории
             index_file = os.path.join(category_dir, f"{category}_index.json")
-            self.export_json({
+            exports.append(({
                 "category": category,
                 "total_items": len(items),
                 "total_chunks": len(chunks),
-                "chunks": [f"{category}_{i+1:03d}.json" for i in range(len(chunks))],
-                "created_at": datetime.now().isoformat()
-            }, index_file)
+                "chunks": filenames,
+                "created_at": self._generated_at
+            }, index_file))
+        
+        self.export_json_many(exports)
+        self._written_layout = (data, layout)
         
         # Показываем сводку экспорта (если не verbose режим)
         if not self.verbose:
@@ -96,12 +152,10 @@ class SplitConverter(BaseConverter):
     
     def create_main_index(self, output_dir: str, all_items: List[Dict], mode: str):
         """Создает общий индекс всех файлов"""
-        categories = self.split_by_category(all_items)
-        
         index = {
             "total_items": len(all_items),
             "categories": {},
-            "created_at": datetime.now().isoformat(),
+            "created_at": self._generated_at,
             "mode": mode,
             "settings": {
                 "max_file_size_kb": self.max_file_size_kb,
@@ -109,12 +163,17 @@ class SplitConverter(BaseConverter):
             }
         }
         
-        for category, items in categories.items():
-            chunks = self.split_into_chunks(items)
+        # Имена файлов берутся из последнего экспорта тех же данных, если он был
+        layout = self._written_layout[1] if self._written_layout and self._written_layout[0] is all_items else {}
+        
+        for category, (items, chunks) in self.plan_split(all_items).items():
+            files = layout.get(category)
+            if files is None:
+                files = [f"{category}_{i:03d}.json" for i in range(1, len(chunks) + 1)]
             index["categories"][category] = {
                 "items_count": len(items),
                 "chunks_count": len(chunks),
-                "files": [f"{category}_{i+1:03d}.json" for i in range(len(chunks))]
+                "files": files
             }
         
         index_file = os.path.join(output_dir, "main_index.json")
@@ -130,24 +189,17 @@ class SplitConverter(BaseConverter):
         size_warnings = []
         lines_warnings = []
         
-        for root, dirs, files in os.walk(output_dir):
-            for file in files:
-                if file.endswith('.json') and not file.endswith('_index.json'):
-                    file_path = os.path.join(root, file)
-                    size_kb = os.path.getsize(file_path) / 1024
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = len(f.readlines())
-                    
-                    total_files += 1
-                    
-                    # Проверяем лимиты
-                    if size_kb > self.max_file_size_kb:
-                        size_warnings.append((file_path, size_kb))
-                    elif lines > 500:
-                        lines_warnings.append((file_path, lines))
-                    else:
-                        valid_files += 1
+        for file_path, size_bytes, lines in self._iter_export_stats(output_dir):
+            size_kb = size_bytes / 1024
+            total_files += 1
+            
+            # Проверяем лимиты
+            if size_kb > self.max_file_size_kb:
+                size_warnings.append((file_path, size_kb))
+            elif lines > 500:
+                lines_warnings.append((file_path, lines))
+            else:
+                valid_files += 1
         
         # Выводим общую статистику
         print(f"📊 Статистика валидации:")
@@ -168,6 +220,30 @@ class SplitConverter(BaseConverter):
         if not size_warnings and not lines_warnings:
             print(f"✅ Все файлы соответствуют лимитам!")
     
+    def _iter_export_stats(self, output_dir: str):
+        """Выдает (путь, размер в байтах, число строк) для файлов чанков в output_dir.
+        
+        Для файлов, записанных этим конвертером, используются размеры, известные при записи;
+        каталог читается с диска, только если в него ничего не экспортировалось.
+        """
+        prefix = os.path.join(output_dir, '')
+        recorded = [(file_path, size_bytes, lines)
+                    for file_path, (size_bytes, lines) in self.written_stats.items()
+                    if file_path.startswith(prefix) and not file_path.endswith('_index.json')]
+        if recorded:
+            yield from recorded
+            return
+        
+        # Обход каталогов через os.scandir: размер берется из уже прочитанной записи каталога
+        stack = [output_dir]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.json') and not entry.name.endswith('_index.json'):
+                        yield entry.path, entry.stat().st_size, _count_lines(entry.path)
+    
     def _group_warnings(self, warnings: List[tuple], warning_type: str, value_extractor):
         """Группирует предупреждения по категориям и диапазонам"""
         if not warnings:
@@ -200,29 +276,14 @@ class SplitConverter(BaseConverter):
     
     def _group_by_ranges(self, items: List[tuple], value_extractor) -> Dict[str, List[tuple]]:
         """Группирует элементы по диапазонам значений"""
-        ranges = {
-            "50-60": [],
-            "60-70": [],
-            "70-80": [],
-            "80-90": [],
-            "90+": []
-        }
+        ranges = [[] for _ in _RANGE_NAMES]
         
+        # Верхние границы включаются в диапазон: 60 попадает в "50-60"
         for item in items:
-            value = value_extractor(item)
-            if value <= 60:
-                ranges["50-60"].append(item)
-            elif value <= 70:
-                ranges["60-70"].append(item)
-            elif value <= 80:
-                ranges["70-80"].append(item)
-            elif value <= 90:
-                ranges["80-90"].append(item)
-            else:
-                ranges["90+"].append(item)
+            ranges[bisect_left(_RANGE_BOUNDS, value_extractor(item))].append(item)
         
         # Убираем пустые диапазоны
-        return {k: v for k, v in ranges.items() if v}
+        return {name: group for name, group in zip(_RANGE_NAMES, ranges) if group}
     
     @abstractmethod
     def convert(self) -> None:
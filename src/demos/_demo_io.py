@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий ввод-вывод демонстраций: загрузка JSON файлов контекста и чтение строк из stdin
+"""
+
+import json
+import mmap
+import os
+import sys
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def load_json_file(path: str) -> Any:
+    """Загружает JSON файл через orjson, если он установлен, иначе через json.
+    
+    orjson разбирает файл прямо из mmap, без промежуточной копии содержимого в памяти процесса.
+    """
+    with open(path, 'rb') as f:
+        if orjson is None or not os.fstat(f.fileno()).st_size:
+            return json.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            return orjson.loads(view)
+
+def read_line(prompt: str) -> Optional[str]:
+    """Выводит приглашение и читает строку из stdin; None - конец ввода.
+    
+    В отличие от input() не задействует readline и не падает с EOFError,
+    когда демонстрация запущена с перенаправленным вводом.
+    """
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    return line if line else None
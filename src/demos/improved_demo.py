@@ -9,10 +9,61 @@
 - Точных версий
 """
 
-import json
+import array
+import re
 import sys
 import argparse
-from typing import Dict, List, Any
+from collections import Counter, defaultdict
+from itertools import chain
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Dict, List, Any, Callable
+
+try:
+    from ._demo_io import load_json_file, read_line
+except ImportError:
+    from _demo_io import load_json_file, read_line
+
+# Слова для индекса ключевых слов: подстрока из символов слова всегда лежит внутри одного такого токена
+_TOKEN_RE = re.compile(r'\w+')
+
+def _freeze_postings(postings: Dict[str, List[int]]) -> Dict[str, array.array]:
+    """Переводит списки позиций индекса в массивы int32 после построения"""
+    return {key: array.array('i', positions) for key, positions in postings.items()}
+
+@dataclass
+class DemoItem:
+    """Элемент контекста демонстрации с полями в слотах (без словаря атрибутов на экземпляр).
+    
+    Создается из разобранного JSON через from_dict(); вложенные варианты синтаксиса остаются словарями.
+    """
+    __slots__ = ('title', 'description', 'syntax', 'category', 'availability', 'version',
+                 'syntax_variants', 'return_value', 'example')
+    
+    title: str
+    description: str
+    syntax: str
+    category: str
+    availability: List[str]
+    version: str
+    syntax_variants: List[Dict[str, Any]]
+    return_value: str
+    example: str
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DemoItem':
+        """Создает элемент из словаря JSON; необязательные поля получают пустые значения"""
+        return cls(
+            data['title'],
+            data['description'],
+            data['syntax'],
+            data['category'],
+            data.get('availability') or [],
+            data.get('version') or '',
+            data.get('syntax_variants') or [],
+            data.get('return_value') or '',
+            data.get('example') or ''
+        )
 
 class ImprovedDemo:
     """Улучшенная демонстрация результатов парсинга"""
@@ -21,12 +72,20 @@ class ImprovedDemo:
         self.context_file = context_file
         self.context_data = []
         self.search_index = {}
+        # Инвертированные индексы: значение в нижнем регистре -> номера элементов
+        self._keyword_index = {}
+        self._availability_index = {}
+        self._category_index = {}
+        self._version_index = {}
+        # Заголовок, описание и синтаксис элемента одной строкой в нижнем регистре, параллельно context_data.
+        # Разделитель \x1f не встречается в тексте, поэтому совпадение не может пересечь границу полей
+        self._haystack_lc = []
         
     def load_context(self) -> bool:
         """Загружает контекст из файла"""
         try:
-            with open(self.context_file, 'r', encoding='utf-8') as f:
-                self.context_data = json.load(f)
+            self.context_data = [DemoItem.from_dict(item) for item in load_json_file(self.context_file)]
+            self._build_indexes()
             print(f"✅ Загружено {len(self.context_data)} элементов контекста")
             return True
         except Exception as e:
@@ -36,111 +95,128 @@ class ImprovedDemo:
     def load_search_index(self, index_file: str) -> bool:
         """Загружает поисковый индекс"""
         try:
-            with open(index_file, 'r', encoding='utf-8') as f:
-                self.search_index = json.load(f)
+            self.search_index = load_json_file(index_file)
             print(f"✅ Загружен поисковый индекс с {len(self.search_index)} ключами")
             return True
         except Exception as e:
             print(f"⚠️  Ошибка при загрузке поискового индекса: {e}")
             return False
     
-    def search_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+    def _build_indexes(self) -> None:
+        """Строит инвертированные индексы и поля в нижнем регистре один раз после загрузки контекста"""
+        self._haystack_lc = ['\x1f'.join((item.title, item.description, item.syntax)).lower()
+                             for item in self.context_data]
+        
+        keyword_index = defaultdict(list)
+        availability_index = defaultdict(list)
+        category_index = defaultdict(list)
+        version_index = defaultdict(list)
+        
+        for i, item in enumerate(self.context_data):
+            for token in dict.fromkeys(_TOKEN_RE.findall(self._haystack_lc[i])):
+                keyword_index[token].append(i)
+            
+            for availability in dict.fromkeys(a.lower() for a in item.availability):
+                availability_index[availability].append(i)
+            
+            category_index[item.category.lower()].append(i)
+            
+            if item.version:
+                version_index[item.version].append(i)
+        
+        # Списки позиций хранятся компактными массивами int32 (4 байта на номер вместо ссылки на объект int)
+        self._keyword_index = _freeze_postings(keyword_index)
+        self._availability_index = _freeze_postings(availability_index)
+        self._category_index = _freeze_postings(category_index)
+        self._version_index = _freeze_postings(version_index)
+    
+    def _search_index(self, index: Dict[str, array.array], matches: Callable[[str], bool]) -> List[DemoItem]:
+        """Собирает элементы по всем ключам индекса, подходящим под условие, в исходном порядке"""
+        found = set()
+        for key, positions in index.items():
+            if matches(key):
+                found.update(positions)
+        return [self.context_data[i] for i in sorted(found)]
+    
+    def search_by_keyword(self, keyword: str) -> List[DemoItem]:
         """Поиск по ключевому слову"""
-        results = []
         keyword_lower = keyword.lower()
         
-        for item in self.context_data:
-            if (keyword_lower in item['title'].lower() or 
-                keyword_lower in item['description'].lower() or
-                keyword_lower in item['syntax'].lower()):
-                results.append(item)
+        # Слово без пробелов и знаков ищется по словарю индекса, а не по текстам всех элементов
+        if _TOKEN_RE.fullmatch(keyword_lower):
+            return self._search_index(self._keyword_index, lambda token: keyword_lower in token)
         
-        return results
+        # Одна проверка подстроки на элемент вместо трех
+        return [self.context_data[i] for i, haystack in enumerate(self._haystack_lc) if keyword_lower in haystack]
     
-    def search_by_availability(self, availability: str) -> List[Dict[str, Any]]:
+    def search_by_availability(self, availability: str) -> List[DemoItem]:
         """Поиск по доступности"""
-        results = []
         availability_lower = availability.lower()
-        
-        for item in self.context_data:
-            for item_availability in item.get('availability', []):
-                if availability_lower in item_availability.lower():
-                    results.append(item)
-                    break
-        
-        return results
+        return self._search_index(self._availability_index, lambda value: availability_lower in value)
     
-    def search_by_category(self, category: str) -> List[Dict[str, Any]]:
+    def search_by_category(self, category: str) -> List[DemoItem]:
         """Поиск по категории"""
-        results = []
         category_lower = category.lower()
-        
-        for item in self.context_data:
-            if category_lower in item['category'].lower():
-                results.append(item)
-        
-        return results
+        return self._search_index(self._category_index, lambda value: category_lower in value)
     
-    def search_by_version(self, version: str) -> List[Dict[str, Any]]:
+    def search_by_version(self, version: str) -> List[DemoItem]:
         """Поиск по версии"""
-        results = []
-        
-        for item in self.context_data:
-            if item.get('version') and version in item['version']:
-                results.append(item)
-        
-        return results
+        return self._search_index(self._version_index, lambda value: version in value)
     
-    def show_item_details(self, item: Dict[str, Any]) -> None:
+    def show_item_details(self, item: DemoItem) -> None:
         """Показывает детальную информацию об элементе"""
-        print(f"\n{'='*80}")
-        print(f"📋 {item['title']}")
-        print(f"{'='*80}")
-        
-        print(f"📝 **Синтаксис:** {item['syntax']}")
-        print(f"📄 **Описание:** {item['description']}")
-        print(f"🏷️  **Категория:** {item['category']}")
-        
-        if item.get('availability'):
-            print(f"🌐 **Доступность:** {', '.join(item['availability'])}")
-        
-        if item.get('version'):
-            print(f"📅 **Версия:** {item['version']}")
-        
-        if item.get('syntax_variants'):
-            print(f"\n🔄 **Варианты синтаксиса:**")
-            for i, variant in enumerate(item['syntax_variants'], 1):
-                print(f"  {i}. **{variant['variant_name']}**: `{variant['syntax']}`")
+        # Карточка собирается целиком и выводится одной записью вместо десятка вызовов print
+        lines = []
+        lines.append(f"\n{'='*80}")
+        lines.append(f"📋 {item.title}")
+        lines.append(f"{'='*80}")
+        
+        lines.append(f"📝 **Синтаксис:** {item.syntax}")
+        lines.append(f"📄 **Описание:** {item.description}")
+        lines.append(f"🏷️  **Категория:** {item.category}")
+        
+        if item.availability:
+            lines.append(f"🌐 **Доступность:** {', '.join(item.availability)}")
+        
+        if item.version:
+            lines.append(f"📅 **Версия:** {item.version}")
+        
+        if item.syntax_variants:
+            lines.append(f"\n🔄 **Варианты синтаксиса:**")
+            for i, variant in enumerate(item.syntax_variants, 1):
+                lines.append(f"  {i}. **{variant['variant_name']}**: `{variant['syntax']}`")
                 
                 if variant['parameters']:
-                    print(f"     **Параметры:**")
+                    lines.append(f"     **Параметры:**")
                     for param in variant['parameters']:
                         optional = "(необязательный)" if param.get('optional') else "(обязательный)"
-                        print(f"     - `{param['name']}` {optional}: {param.get('type', '')}")
+                        lines.append(f"     - `{param['name']}` {optional}: {param.get('type', '')}")
                         if param.get('description'):
-                            print(f"       {param['description']}")
+                            lines.append(f"       {param['description']}")
+        
+        if item.return_value:
+            lines.append(f"\n↩️  **Возвращаемое значение:** {item.return_value}")
         
-        if item.get('return_value'):
-            print(f"\n↩️  **Возвращаемое значение:** {item['return_value']}")
+        if item.example:
+            lines.append(f"\n💡 **Пример:** {item.example}")
         
-        if item.get('example'):
-            print(f"\n💡 **Пример:** {item['example']}")
+        lines.append(f"{'='*80}")
         
-        print(f"{'='*80}")
+        sys.stdout.write('\n'.join(lines) + '\n')
     
-    def compare_with_original(self, item: Dict[str, Any]) -> None:
+    def compare_with_original(self, item: DemoItem) -> None:
         """Сравнивает с оригинальной документацией"""
         print(f"\n🔍 **Сравнение с оригиналом:**")
         
         # Проверяем множественные варианты синтаксиса
-        if item.get('syntax_variants') and len(item['syntax_variants']) > 1:
-            print(f"✅ Множественные варианты синтаксиса: {len(item['syntax_variants'])} вариантов")
+        if item.syntax_variants and len(item.syntax_variants) > 1:
+            print(f"✅ Множественные варианты синтаксиса: {len(item.syntax_variants)} вариантов")
         else:
             print(f"⚠️  Один вариант синтаксиса или отсутствует")
         
         # Проверяем описания параметров
         has_param_descriptions = False
-        for variant in item.get('syntax_variants', []):
+        for variant in item.syntax_variants:
             for param in variant.get('parameters', []):
                 if param.get('description'):
                     has_param_descriptions = True
@@ -152,14 +228,14 @@ class ImprovedDemo:
             print(f"⚠️  Описания параметров отсутствуют")
         
         # Проверяем детальную доступность
-        if item.get('availability') and len(item['availability']) > 2:
-            print(f"✅ Детальная информация о доступности: {len(item['availability'])} элементов")
+        if item.availability and len(item.availability) > 2:
+            print(f"✅ Детальная информация о доступности: {len(item.availability)} элементов")
         else:
             print(f"⚠️  Упрощенная информация о доступности")
         
         # Проверяем точность версии
-        if item.get('version') and '8.' in item['version']:
-            print(f"✅ Точная информация о версии: {item['version']}")
+        if item.version and '8.' in item.version:
+            print(f"✅ Точная информация о версии: {item.version}")
         else:
             print(f"⚠️  Неточная или отсутствующая информация о версии")
     
@@ -175,7 +251,7 @@ class ImprovedDemo:
         if delete_results:
             # Показываем первый результат
             first_result = delete_results[0]
-            print(f"   Первый результат: {first_result['title']}")
+            print(f"   Первый результат: {first_result.title}")
             
             # Показываем детали
             self.show_item_details(first_result)
@@ -189,7 +265,7 @@ class ImprovedDemo:
         print(f"   Найдено: {len(server_results)} элементов")
         
         if server_results:
-            print(f"   Примеры: {', '.join([r['title'] for r in server_results[:3]])}")
+            print(f"   Примеры: {', '.join([r.title for r in server_results[:3]])}")
         
         # Поиск по категории "methods"
         print(f"\n3️⃣ Поиск по категории 'methods':")
@@ -197,7 +273,7 @@ class ImprovedDemo:
         print(f"   Найдено: {len(method_results)} элементов")
         
         if method_results:
-            print(f"   Примеры: {', '.join([r['title'] for r in method_results[:3]])}")
+            print(f"   Примеры: {', '.join([r.title for r in method_results[:3]])}")
         
         # Поиск по версии "8.2"
         print(f"\n4️⃣ Поиск по версии '8.2':")
@@ -205,7 +281,7 @@ class ImprovedDemo:
         print(f"   Найдено: {len(version_results)} элементов")
         
         if version_results:
-            print(f"   Примеры: {', '.join([r['title'] for r in version_results[:3]])}")
+            print(f"   Примеры: {', '.join([r.title for r in version_results[:3]])}")
     
     def interactive_search(self) -> None:
         """Интерактивный поиск"""
@@ -219,7 +295,10 @@ class ImprovedDemo:
         
         while True:
             try:
-                command = input(f"\nВведите команду: ").strip()
+                command = read_line(f"\nВведите команду: ")
+                if command is None:
+                    break
+                command = command.strip()
                 
                 if command.lower() == 'quit':
                     break
@@ -270,18 +349,19 @@ class ImprovedDemo:
         # Общая статистика
         print(f"Всего элементов: {len(self.context_data)}")
         
-        # Статистика по категориям
-        categories = {}
-        for item in self.context_data:
-            category = item['category']
-            categories[category] = categories.get(category, 0) + 1
+        # Каждый агрегат считается по своей колонке: Counter получает итератор и считает в C,
+        # без Python-цикла с обновлением нескольких счетчиков на каждый элемент
+        categories = Counter(map(attrgetter('category'), self.context_data))
+        availability_stats = Counter(chain.from_iterable(item.availability for item in self.context_data))
+        version_stats = Counter(filter(None, (item.version for item in self.context_data)))
+        with_variants = sum(1 for item in self.context_data if item.syntax_variants)
         
+        # Статистика по категориям
         print(f"По категориям:")
         for category, count in sorted(categories.items()):
             print(f"  {category}: {count}")
         
         # Статистика по вариантам синтаксиса
-        with_variants = sum(1 for item in self.context_data if item.get('syntax_variants'))
         without_variants = len(self.context_data) - with_variants
         
         print(f"Варианты синтаксиса:")
@@ -289,22 +369,11 @@ class ImprovedDemo:
         print(f"  Без вариантов: {without_variants}")
         
         # Статистика по доступности
-        availability_stats = {}
-        for item in self.context_data:
-            for availability in item.get('availability', []):
-                availability_stats[availability] = availability_stats.get(availability, 0) + 1
-        
         print(f"По доступности (топ-5):")
-        sorted_availability = sorted(availability_stats.items(), key=lambda x: x[1], reverse=True)
-        for availability, count in sorted_availability[:5]:
+        for availability, count in availability_stats.most_common(5):
             print(f"  {availability}: {count}")
         
         # Статистика по версиям
-        version_stats = {}
-        for item in self.context_data:
-            if item.get('version'):
-                version_stats[item['version']] = version_stats.get(item['version'], 0) + 1
-        
         print(f"По версиям:")
         for version, count in sorted(version_stats.items()):
             print(f"  {version}: {count}")
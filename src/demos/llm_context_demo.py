@@ -5,12 +5,39 @@
 Показывает как загружать и использовать контекст для ответов на вопросы
 """
 
-import json
+import array
 import os
 import sys
+import heapq
+from collections import Counter, defaultdict
 from typing import List, Dict, Any, Optional
 import re
 
+try:
+    from ._demo_io import load_json_file, read_line
+except ImportError:
+    from _demo_io import load_json_file, read_line
+
+# Регулярное выражение для слов запроса компилируется один раз
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Раздел описания в тексте элемента: от заголовка до следующего раздела или разделителя
+_DESCRIPTION_HEADER = '## Описание\n'
+_DESCRIPTION_ENDS = ('\n##', '\n---')
+
+# Сколько последних запросов помнит search_context (интерактивный режим часто повторяет вопросы)
+_SEARCH_CACHE_SIZE = 256
+
+def _extract_description(content: str) -> Optional[str]:
+    """Возвращает текст раздела "## Описание" или None, если раздела нет"""
+    _, header, tail = content.partition(_DESCRIPTION_HEADER)
+    if not header:
+        return None
+    
+    # Раздел заканчивается на ближайшем из разделителей, без них - в конце текста
+    ends = [pos for pos in map(tail.find, _DESCRIPTION_ENDS) if pos >= 0]
+    return tail[:min(ends)] if ends else tail
+
 class LLMContextDemo:
     """Демонстрация работы с context файлами для LLM"""
     
@@ -18,13 +45,19 @@ class LLMContextDemo:
         self.context_file = context_file
         self.context_data = []
         self.search_index = {}
+        # Индексы токен -> номера элементов, строятся при загрузке контекста
+        self._title_postings = {}
+        self._content_postings = {}
+        # Кэш поиска: (слова запроса, max_results) -> номера элементов, сбрасывается при загрузке контекста
+        self._search_cache = {}
         
     def load_context(self) -> bool:
         """Загружает контекст из JSON файла"""
         try:
-            with open(self.context_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.context_data = data.get('context_items', [])
+            data = load_json_file(self.context_file)
+            self.context_data = data.get('context_items', [])
+            self._build_postings()
+            self._search_cache.clear()
             
             print(f"Загружено {len(self.context_data)} элементов контекста")
             return True
@@ -35,9 +68,8 @@ class LLMContextDemo:
     def load_search_index(self, index_file: str) -> bool:
         """Загружает поисковый индекс"""
         try:
-            with open(index_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.search_index = data.get('index', {})
+            data = load_json_file(index_file)
+            self.search_index = data.get('index', {})
             
             print(f"Загружен поисковый индекс с {len(self.search_index)} ключевыми словами")
             return True
@@ -47,32 +79,55 @@ class LLMContextDemo:
     
     def search_context(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Ищет релевантный контекст по запросу"""
-        query_words = re.findall(r'\b\w+\b', query.lower())
-        relevant_items = []
+        # Результат зависит только от значимых слов запроса, по ним и кэшируется
+        key = (tuple(word for word in _WORD_RE.findall(query.lower()) if len(word) > 2), max_results)  # Игнорируем короткие слова
+        cache = self._search_cache
+        top = cache.pop(key, None)
+        if top is None:
+            top = self._search_top(key[0], max_results)
+            if len(cache) >= _SEARCH_CACHE_SIZE:
+                # Вытесняем давно не использованный запрос (dict хранит порядок обращений)
+                del cache[next(iter(cache))]
+        cache[key] = top
         
-        for item in self.context_data:
-            score = 0
-            title = item['title'].lower()
-            content = item['content'].lower()
-            
-            # Подсчитываем релевантность
-            for word in query_words:
-                if len(word) > 2:  # Игнорируем короткие слова
-                    if word in title:
-                        score += 3  # Высокий вес для заголовка
-                    if word in content:
-                        score += 1  # Низкий вес для содержимого
-            
-            if score > 0:
-                relevant_items.append({
-                    'item': item,
-                    'score': score
-                })
+        return [self.context_data[i] for i in top]
+    
+    def _search_top(self, words: tuple, max_results: int) -> List[int]:
+        """Номера элементов, наиболее релевантных словам запроса"""
+        scores = Counter()
+        
+        # Подсчитываем релевантность: слово запроса из символов слова совпадает с подстрокой
+        # заголовка или текста только внутри одного токена, поэтому достаточно просмотреть словарь индекса
+        for word in words:
+            scores.update(dict.fromkeys(self._matching_items(self._title_postings, word), 3))  # Высокий вес для заголовка
+            scores.update(dict.fromkeys(self._matching_items(self._content_postings, word), 1))  # Низкий вес для содержимого
+        
+        # Сортируем по релевантности, при равной релевантности - в исходном порядке
+        return heapq.nsmallest(max_results, scores, key=lambda i: (-scores[i], i))
+    
+    @staticmethod
+    def _matching_items(postings: Dict[str, array.array], word: str) -> set:
+        """Номера элементов, в токенах которых встречается word"""
+        items = set()
+        for token, positions in postings.items():
+            if word in token:
+                items.update(positions)
+        return items
+    
+    def _build_postings(self) -> None:
+        """Строит индексы токен -> номера элементов для заголовков и содержимого"""
+        title_postings = defaultdict(list)
+        content_postings = defaultdict(list)
         
-        # Сортируем по релевантности
-        relevant_items.sort(key=lambda x: x['score'], reverse=True)
+        for i, item in enumerate(self.context_data):
+            for token in dict.fromkeys(_WORD_RE.findall(item['title'].lower())):
+                title_postings[token].append(i)
+            for token in dict.fromkeys(_WORD_RE.findall(item['content'].lower())):
+                content_postings[token].append(i)
         
-        return [item['item'] for item in relevant_items[:max_results]]
+        # Списки позиций хранятся компактными массивами int32 (4 байта на номер вместо ссылки на объект int)
+        self._title_postings = {token: array.array('i', positions) for token, positions in title_postings.items()}
+        self._content_postings = {token: array.array('i', positions) for token, positions in content_postings.items()}
     
     def generate_response(self, question: str) -> str:
         """Генерирует ответ на основе контекста (демонстрация)"""
@@ -95,10 +150,9 @@ class LLMContextDemo:
                 response_parts.append(f"   Синтаксис: `{context_item['metadata']['syntax']}`")
             
             # Извлекаем описание из content
-            content = context_item['content']
-            description_match = re.search(r'## Описание\n(.*?)(?=\n##|\n---|\n$)', content, re.DOTALL)
-            if description_match:
-                description = description_match.group(1).strip()
+            description = _extract_description(context_item['content'])
+            if description is not None:
+                description = description.strip()
                 if len(description) > 200:
                     description = description[:200] + "..."
                 response_parts.append(f"   Описание: {description}")
@@ -121,7 +175,10 @@ class LLMContextDemo:
         
         try:
             while True:
-                question = input("Ваш вопрос: ").strip()
+                question = read_line("Ваш вопрос: ")
+                if question is None:
+                    break
+                question = question.strip()
                 if question:
                     response = self.generate_response(question)
                     print(response)
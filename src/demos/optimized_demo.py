@@ -6,11 +6,17 @@
 Показывает возможности поиска по критически важным полям
 """
 
-import json
+import os
 import sys
 import re
+from collections import defaultdict
 from typing import List, Dict, Any
 
+try:
+    from ._demo_io import load_json_file, read_line
+except ImportError:
+    from _demo_io import load_json_file, read_line
+
 
 class OptimizedContextDemo:
     """Демонстрация оптимизированного контекста"""
@@ -19,20 +25,40 @@ class OptimizedContextDemo:
         self.context_file = context_file
         self.context_data = None
         self.search_index = None
+        # Поля элементов в нижнем регистре, параллельные context_data: считаются один раз при загрузке
+        self._text_lc = []
+        self._availability_lc = []
+        # Номера элементов по категории в нижнем регистре (категорий единицы, элементов тысячи)
+        self._by_category = {}
+        # Элементы по ID для поиска через индекс
+        self._by_id = {}
         
     def load_context(self) -> bool:
         """Загружает оптимизированный контекст"""
         try:
-            with open(self.context_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json_file(self.context_file)
             
             self.context_data = data.get('items', [])
             self.search_index = data.get('search', {})
             
+            self._text_lc = [f"{item['title']} {item.get('description', '')}".lower() for item in self.context_data]
+            # Доступность - множество значений в нижнем регистре: запрос проверяется одной хеш-пробой
+            self._availability_lc = [frozenset(av.lower() for av in item.get('availability', [])) for item in self.context_data]
+            by_category = defaultdict(list)
+            for i, item in enumerate(self.context_data):
+                by_category[item.get('category', '').lower()].append(i)
+            self._by_category = dict(by_category)
+            
+            # При повторяющихся ID сохраняется первый элемент, как при прежнем линейном поиске
+            self._by_id = {}
+            for item in self.context_data:
+                if item.get('id') is not None:
+                    self._by_id.setdefault(item['id'], item)
+            
             print(f"Загружен оптимизированный контекст:")
             print(f"- Элементов: {len(self.context_data)}")
             print(f"- Поисковых ключей: {len(self.search_index)}")
-            print(f"- Размер файла: {len(json.dumps(data, ensure_ascii=False)) / 1024:.1f}KB")
+            print(f"- Размер файла: {os.path.getsize(self.context_file) / 1024:.1f}KB")
             
             return True
             
@@ -49,17 +75,13 @@ class OptimizedContextDemo:
         if keyword_lower in self.search_index:
             item_ids = self.search_index[keyword_lower]
             
-            for item_id in item_ids[:max_results]:
-                item = self.find_item_by_id(item_id)
-                if item:
-                    results.append(item)
+            results = [self._by_id[item_id] for item_id in item_ids[:max_results] if self._by_id.get(item_id)]
         
         # Если не найдено в индексе, ищем по тексту
         if not results:
-            for item in self.context_data:
-                search_text = f"{item['title']} {item.get('description', '')}".lower()
+            for i, search_text in enumerate(self._text_lc):
                 if keyword_lower in search_text:
-                    results.append(item)
+                    results.append(self.context_data[i])
                     if len(results) >= max_results:
                         break
         
@@ -70,10 +92,9 @@ class OptimizedContextDemo:
         availability_lower = availability.lower()
         results = []
         
-        for item in self.context_data:
-            item_availability = [av.lower() for av in item.get('availability', [])]
+        for i, item_availability in enumerate(self._availability_lc):
             if availability_lower in item_availability:
-                results.append(item)
+                results.append(self.context_data[i])
                 if len(results) >= max_results:
                     break
         
@@ -94,53 +115,45 @@ class OptimizedContextDemo:
     
     def search_by_category(self, category: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Поиск по категории"""
-        category_lower = category.lower()
-        results = []
-        
-        for item in self.context_data:
-            item_category = item.get('category', '').lower()
-            if category_lower == item_category:
-                results.append(item)
-                if len(results) >= max_results:
-                    break
-        
-        return results
+        positions = self._by_category.get(category.lower(), [])
+        return [self.context_data[i] for i in positions[:max_results]]
     
     def find_item_by_id(self, item_id: str) -> Dict[str, Any]:
         """Находит элемент по ID"""
-        for item in self.context_data:
-            if item.get('id') == item_id:
-                return item
-        return None
+        return self._by_id.get(item_id)
     
     def display_item(self, item: Dict[str, Any]) -> None:
         """Отображает элемент в читаемом формате"""
-        print(f"\n{'='*80}")
-        print(f"📄 {item['title']}")
-        print(f"{'='*80}")
+        # Карточка собирается целиком и выводится одной записью вместо отдельных вызовов print
+        lines = []
+        lines.append(f"\n{'='*80}")
+        lines.append(f"📄 {item['title']}")
+        lines.append(f"{'='*80}")
         
         if item.get('syntax'):
-            print(f"🔧 Синтаксис: {item['syntax']}")
+            lines.append(f"🔧 Синтаксис: {item['syntax']}")
         
         if item.get('description'):
-            print(f"📝 Описание: {item['description']}")
+            lines.append(f"📝 Описание: {item['description']}")
         
         if item.get('parameters'):
-            print(f"📋 Параметры:")
+            lines.append(f"📋 Параметры:")
             for param in item['parameters']:
                 required = "обязательный" if param.get('required', True) else "необязательный"
-                print(f"  - {param['name']} ({param['type']}) - {required}")
+                lines.append(f"  - {param['name']} ({param['type']}) - {required}")
         
         if item.get('return_value'):
-            print(f"🔄 Возвращаемое значение: {item['return_value']}")
+            lines.append(f"🔄 Возвращаемое значение: {item['return_value']}")
         
         if item.get('availability'):
-            print(f"✅ Доступность: {', '.join(item['availability'])}")
+            lines.append(f"✅ Доступность: {', '.join(item['availability'])}")
         
         if item.get('version'):
-            print(f"📅 Версия: {item['version']}")
+            lines.append(f"📅 Версия: {item['version']}")
         
-        print(f"🏷️  Категория: {item.get('category', 'неизвестно')}")
+        lines.append(f"🏷️  Категория: {item.get('category', 'неизвестно')}")
+        
+        sys.stdout.write('\n'.join(lines) + '\n')
     
     def display_search_results(self, results: List[Dict[str, Any]], query: str) -> None:
         """Отображает результаты поиска"""
@@ -170,7 +183,10 @@ class OptimizedContextDemo:
         
         while True:
             try:
-                query = input("\n🔍 Введите запрос (или 0 для выхода): ").strip()
+                query = read_line("\n🔍 Введите запрос (или 0 для выхода): ")
+                if query is None:
+                    break
+                query = query.strip()
                 
                 if query == '0':
                     break
@@ -205,7 +221,7 @@ class OptimizedContextDemo:
                 
                 # Показать детали первого результата
                 if results and len(results) > 0:
-                    show_details = input(f"\n📖 Показать детали первого результата? (y/n): ").strip().lower()
+                    show_details = (read_line(f"\n📖 Показать детали первого результата? (y/n): ") or '').strip().lower()
                     if show_details == 'y':
                         self.display_item(results[0])
                 
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import array
+import heapq
 import json
+import math
+import mmap
+import os
+import re
 import sys
-from typing import Dict, List, Any
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 
 def load_context(context_file: str) -> Dict[str, Any]:
     """Загружает контекст из JSON файла"""
@@ -14,42 +21,141 @@ def load_context(context_file: str) -> Dict[str, Any]:
         print(f"Ошибка загрузки контекста: {e}")
         return {}
 
-def load_search_index(index_file: str) -> Dict[str, Any]:
-    """Загружает поисковый индекс"""
-    try:
-        with open(index_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Ошибка загрузки индекса: {e}")
-        return {}
+# Токены для индекса и запросов
+_TOKEN_RE = re.compile(r'\w+')
 
-def search_context(query: str, context: Dict[str, Any], search_index: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Ищет релевантную информацию в контексте"""
-    query_lower = query.lower()
-    results = []
-    
-    # Поиск по индексу
-    for keyword, item_ids in search_index.get('index', {}).items():
-        if query_lower in keyword or keyword in query_lower:
-            for item_id in item_ids:
-                # Находим элемент в контексте
-                for item in context.get('context_items', []):
-                    if item['id'] == item_id:
-                        results.append(item)
-                        break
-    
-    # Прямой поиск по заголовкам и содержимому
-    for item in context.get('context_items', []):
-        title_lower = item.get('title', '').lower()
-        content_lower = item.get('content', '').lower()
+class BM25Index:
+    """Инвертированный индекс элементов контекста с ранжированием BM25.
+    
+    Строится один раз по заголовку и содержимому элементов; запрос оценивается
+    только по спискам позиций своих терминов, без просмотра текстов.
+    
+    Списки позиций всех терминов лежат подряд в двух плоских столбцах int32
+    (номера элементов и частоты), термин хранит лишь границы своего отрезка.
+    Такой индекс сохраняется на диск через save() и открывается через load()
+    прямо из отображенного в память файла, без разбора и копирования.
+    """
+    
+    def __init__(self, items: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        postings = defaultdict(list)
+        doc_len = array.array('i')
         
-        if (query_lower in title_lower or 
-            query_lower in content_lower or
-            any(word in title_lower for word in query_lower.split())):
-            if item not in results:
-                results.append(item)
+        for doc_id, item in enumerate(items):
+            tokens = _TOKEN_RE.findall(f"{item.get('title', '')} {item.get('content', '')}".lower())
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+        
+        doc_ids = array.array('i')
+        tfs = array.array('i')
+        offsets = {}
+        for term, pairs in postings.items():
+            start = len(doc_ids)
+            doc_ids.extend([doc_id for doc_id, _ in pairs])
+            tfs.extend([tf for _, tf in pairs])
+            offsets[term] = (start, len(doc_ids))
+        
+        self._init(offsets, doc_ids, tfs, doc_len, k1, b)
+        # Файл контекста, по которому построен индекс (известен для индексов, загруженных через load())
+        self.source = None
     
-    return results[:5]  # Возвращаем топ-5 результатов
+    def _init(self, offsets: Dict[str, Tuple[int, int]], doc_ids: Sequence[int], tfs: Sequence[int],
+              doc_len: Sequence[int], k1: float, b: float) -> None:
+        """Заполняет поля индекса по готовым столбцам (общая часть построения и загрузки)"""
+        self.k1 = k1
+        self.b = b
+        # Термин -> (начало, конец) отрезка в столбцах doc_ids/tfs
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.avgdl = sum(doc_len) / len(doc_len) if len(doc_len) else 0.0
+        # Зависящая только от длины элемента часть знаменателя: k1 * (1 - b + b * |d| / avgdl).
+        # Если все элементы пустые (avgdl = 0), длины тоже нулевые и нормировать нечего
+        avgdl = self.avgdl or 1.0
+        self._doc_norm = array.array('d', [k1 * (1 - b + b * length / avgdl) for length in doc_len])
+    
+    def save(self, filename: str, source: Optional[str] = None) -> None:
+        """Сохраняет индекс: столбцы int32 в filename, словарь терминов и параметры в filename + '.json'.
+        
+        source - файл контекста, по которому построен индекс; его абсолютный путь сохраняется в метаданных.
+        """
+        with open(filename, 'wb') as f:
+            for column in (self.doc_len, self.doc_ids, self.tfs):
+                f.write(memoryview(column).cast('B'))
+        
+        meta = {
+            'k1': self.k1,
+            'b': self.b,
+            'source': os.path.abspath(source) if source else None,
+            'itemsize': array.array('i').itemsize,
+            'byteorder': sys.byteorder,
+            'total_items': len(self.doc_len),
+            'total_postings': len(self.doc_ids),
+            'offsets': self.offsets
+        }
+        with open(filename + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, filename: str) -> 'BM25Index':
+        """Открывает индекс, сохраненный save(): столбцы читаются прямо из mmap"""
+        with open(filename + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        if meta['itemsize'] != array.array('i').itemsize or meta['byteorder'] != sys.byteorder:
+            raise ValueError("индекс сохранен на платформе с другим форматом int32")
+        
+        n_docs = meta['total_items']
+        n_postings = meta['total_postings']
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size != (n_docs + 2 * n_postings) * meta['itemsize']:
+                raise ValueError("размер файла индекса не совпадает с метаданными")
+            # Пустой файл (индекс без элементов) отобразить нельзя
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        column = memoryview(mapped).cast('i')
+        
+        index = cls.__new__(cls)
+        # Срезы memoryview ссылаются на отображение, пока жив индекс
+        index._mapped = mapped
+        index.source = meta.get('source')
+        offsets = {term: tuple(bounds) for term, bounds in meta['offsets'].items()}
+        index._init(offsets, column[n_docs:n_docs + n_postings], column[n_docs + n_postings:],
+                    column[:n_docs], meta['k1'], meta['b'])
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.offsets)
+    
+    def idf(self, term: str) -> float:
+        """IDF термина (вариант с +1 под логарифмом, всегда неотрицательный)"""
+        start, end = self.offsets.get(term, (0, 0))
+        df = end - start
+        n_docs = len(self.doc_len)
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    
+    def search(self, query: str, max_results: int = 5) -> List[int]:
+        """Номера элементов с наибольшей оценкой BM25, при равной оценке - в исходном порядке"""
+        doc_norm = self._doc_norm
+        scores = defaultdict(float)
+        
+        # Каждый термин запроса вносит свой вклад со своим IDF
+        for term in dict.fromkeys(_TOKEN_RE.findall(query.lower())):
+            bounds = self.offsets.get(term)
+            if bounds is None:
+                continue
+            start, end = bounds
+            scale = self.idf(term) * (self.k1 + 1)
+            for doc_id, tf in zip(self.doc_ids[start:end], self.tfs[start:end]):
+                scores[doc_id] += scale * tf / (tf + doc_norm[doc_id])
+        
+        return heapq.nsmallest(max_results, scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+
+def search_context(query: str, context: Dict[str, Any], index: BM25Index) -> List[Dict[str, Any]]:
+    """Ищет релевантную информацию в контексте"""
+    items = context.get('context_items', [])
+    return [items[doc_id] for doc_id in index.search(query)]  # Возвращаем топ-5 результатов
 
 def generate_answer(query: str, results: List[Dict[str, Any]]) -> str:
     """Генерирует ответ на основе найденных результатов"""
@@ -79,23 +185,53 @@ def generate_answer(query: str, results: List[Dict[str, Any]]) -> str:
     return answer
 
 def main():
-    if len(sys.argv) != 2:
-        print("Использование: python test_root_demo.py <путь_к_1c_context.json>")
+    args = sys.argv[1:]
+    build_index = '--build-index' in args
+    if build_index:
+        args.remove('--build-index')
+    if len(args) != 1:
+        print("Использование: python test_root_demo.py <путь_к_1c_context.json> [--build-index]")
+        print("  --build-index - построить индекс BM25 и сохранить его рядом с контекстом (<имя_контекста>_bm25.bin)")
         return
     
-    context_file = sys.argv[1]
-    index_file = context_file.replace('1c_context.json', '1c_search_index.json')
+    context_file = args[0]
+    # У каждого файла контекста свой индекс: data/1c_context.json -> data/1c_context_bm25.bin
+    index_file = os.path.splitext(context_file)[0] + '_bm25.bin'
     
     # Загружаем данные
     context = load_context(context_file)
-    search_index = load_search_index(index_file)
     
-    if not context or not search_index:
+    if not context:
         print("Не удалось загрузить данные")
         return
     
-    print(f"Загружено {len(context.get('context_items', []))} элементов контекста")
-    print(f"Загружен поисковый индекс с {len(search_index.get('index', {}))} ключевыми словами")
+    items = context.get('context_items', [])
+    search_index = None
+    
+    # Сохраненный индекс открывается из файла, если он не старше контекста
+    if not build_index and os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(context_file):
+        try:
+            search_index = BM25Index.load(index_file)
+            if search_index.source != os.path.abspath(context_file) or len(search_index.doc_len) != len(items):
+                print("Сохраненный индекс не соответствует контексту, строим заново")
+                search_index = None
+        except Exception as e:
+            print(f"Ошибка загрузки индекса: {e}")
+    
+    print(f"Загружено {len(items)} элементов контекста")
+    
+    if search_index is None:
+        # Индекс строится один раз для всех вопросов
+        search_index = BM25Index(items)
+        print(f"Построен поисковый индекс BM25 с {len(search_index)} терминами")
+        
+        if build_index:
+            search_index.save(index_file, context_file)
+            print(f"Индекс сохранен: {index_file}")
+            return
+    else:
+        print(f"Загружен поисковый индекс BM25 с {len(search_index)} терминами")
+    
     print("=== Демонстрация ответов ===\n")
     
     # Тестовые вопросы на английском
@@ -6,25 +6,53 @@
 """
 
 import zipfile
+import importlib.util
 import os
 import sys
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable
 from abc import ABC, abstractmethod
 
+# Регулярные выражения, компилируемые один раз при загрузке модуля
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Блоки, содержимое которых парсерам не нужно: вырезаются до построения дерева
+_SKIP_BLOCKS_RE = re.compile(r'<(script|style|noscript)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# Бэкенд BeautifulSoup выбирается один раз при импорте: lxml (C-библиотека libxml2) значительно
+# быстрее html.parser, но без установленного lxml парсеры работают на встроенном html.parser
+_HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+def _decode_member(content: bytes) -> str:
+    """Декодирует содержимое файла архива: UTF-8, если не получается - cp1251"""
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('cp1251', errors='ignore')
+
 class BaseParser(ABC):
     """Базовый класс для всех парсеров"""
     
+    # Бэкенд BeautifulSoup (см. _HTML_PARSER)
+    html_parser = _HTML_PARSER
+    
     def __init__(self, hbk_file: str):
         self.hbk_file = hbk_file
         self.zip_file = None
+        # Имена файлов архива читаются из центрального каталога один раз при открытии
+        self._namelist = []
+        self._name_set = frozenset()
         
     def open_archive(self) -> bool:
         """Открывает архив .hbk как ZIP"""
         try:
             self.zip_file = zipfile.ZipFile(self.hbk_file, 'r')
+            self._namelist = self.zip_file.namelist()
+            self._name_set = frozenset(self._namelist)
             return True
         except zipfile.BadZipFile:
             print(f"Ошибка: '{self.hbk_file}' не является корректным ZIP-архивом")
@@ -34,15 +62,12 @@ class BaseParser(ABC):
             return False
     
     def list_contents(self) -> List[str]:
-        """Возвращает список файлов в архиве"""
-        if not self.zip_file:
-            return []
-        
-        try:
-            return self.zip_file.namelist()
-        except Exception as e:
-            print(f"Ошибка при получении списка файлов: {e}")
-            return []
+        """Возвращает список файлов в архиве (общий кэшированный список, не изменяйте его)"""
+        return self._namelist if self.zip_file else []
+    
+    def has_file(self, filename: str) -> bool:
+        """Проверяет наличие файла в архиве без перебора списка имен"""
+        return filename in self._name_set
     
     def extract_file_content(self, filename: str) -> Optional[str]:
         """Извлекает содержимое файла из архива"""
@@ -51,16 +76,63 @@ class BaseParser(ABC):
         
         try:
             with self.zip_file.open(filename, 'r') as f:
-                content = f.read()
-                # Пытаемся декодировать как UTF-8, если не получается - как cp1251
-                try:
-                    return content.decode('utf-8')
-                except UnicodeDecodeError:
-                    return content.decode('cp1251', errors='ignore')
+                return _decode_member(f.read())
         except Exception as e:
             print(f"Ошибка при извлечении файла {filename}: {e}")
             return None
     
+    def extract_many(self, filenames: Iterable[str], max_workers: Optional[int] = None) -> Dict[str, str]:
+        """Извлекает содержимое нескольких файлов архива в пуле потоков.
+        
+        Распаковка zlib отпускает GIL, поэтому потоки работают параллельно; у каждого потока
+        свой дескриптор ZipFile. Возвращает словарь имя -> текст в порядке filenames,
+        файлы с ошибками пропускаются.
+        """
+        if not self.zip_file:
+            return {}
+        
+        filenames = list(filenames)
+        workers = max_workers or os.cpu_count() or 1
+        
+        # На одном ядре пул потоков только добавляет накладные расходы
+        if workers < 2:
+            contents = {}
+            for filename in filenames:
+                content = self.extract_file_content(filename)
+                if content is not None:
+                    contents[filename] = content
+            return contents
+        
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        
+        def read_member(filename: str):
+            # Ошибка возвращается как результат, чтобы один файл не прерывал весь пакет
+            try:
+                archive = getattr(local, 'archive', None)
+                if archive is None:
+                    archive = local.archive = zipfile.ZipFile(self.hbk_file, 'r')
+                    with handles_lock:
+                        handles.append(archive)
+                return _decode_member(archive.read(filename))
+            except Exception as e:
+                return e
+        
+        contents = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for filename, result in zip(filenames, executor.map(read_member, filenames)):
+                    if isinstance(result, Exception):
+                        print(f"Ошибка при извлечении файла {filename}: {result}")
+                        continue
+                    contents[filename] = result
+        finally:
+            for archive in handles:
+                archive.close()
+        
+        return contents
+    
     def extract_file(self, filename: str, extract_path: str = "extracted") -> Optional[str]:
         """Извлекает файл из архива на диск"""
         if not self.zip_file:
@@ -79,21 +151,22 @@ class BaseParser(ABC):
         if not text:
             return ""
         
-        # Удаляем лишние пробелы и переносы строк
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
+        # Удаляем лишние пробелы и переносы строк (split/join работает в C быстрее регулярки)
+        text = ' '.join(text.split())
         
         # Удаляем HTML-теги
-        text = re.sub(r'<[^>]+>', '', text)
+        text = _TAG_RE.sub('', text)
         
         return text
     
     def parse_html_content(self, html_content: str) -> BeautifulSoup:
         """Парсит HTML-контент и возвращает BeautifulSoup объект"""
         try:
-            return BeautifulSoup(html_content, 'html.parser')
+            html_content = _SKIP_BLOCKS_RE.sub('', html_content)
+            return BeautifulSoup(html_content, self.html_parser)
         except Exception as e:
             print(f"Ошибка при парсинге HTML: {e}")
+            # Пустой документ строится встроенным html.parser: он не может упасть на пустой строке
             return BeautifulSoup("", 'html.parser')
     
     def close(self):
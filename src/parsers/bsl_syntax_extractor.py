@@ -11,13 +11,43 @@ import re
 import argparse
 from bs4 import BeautifulSoup
 import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 try:
     from .base_parser import BaseParser
 except ImportError:
     from base_parser import BaseParser
 
+# Ключевые слова секций, которые не относятся к описанию элементов коллекции
+_SECTION_KEYWORDS_RE = re.compile('|'.join(map(re.escape, [
+    'Методы', 'Описание', 'Доступность', 'См. также', 'Использование в версии'
+])))
+
+# Ключевые слова, указывающие на информацию об обходе и индексации коллекции
+_USAGE_KEYWORDS_RE = re.compile('|'.join(map(re.escape, [
+    'Для каждого', 'Из', 'Цикл', 'индекс', 'оператор'
+])))
+
+# Признаки категории в заголовке в порядке приоритета: русское название или английское без учета регистра
+_CATEGORY_PATTERNS = tuple((category, re.compile(rf'{ru}|(?i:{en})')) for category, ru, en in [
+    ('functions', 'Функция', 'function'),
+    ('methods', 'Метод', 'method'),
+    ('properties', 'Свойство', 'property'),
+    ('operators', 'Оператор', 'operator'),
+    ('keywords', 'Ключевое слово', 'keyword')
+])
+
+# Разбор HTML распределяется по процессам, только если файлов достаточно, чтобы окупить запуск пула;
+# файлы передаются пулу пакетами, чтобы не держать в памяти содержимое всего архива
+_PARALLEL_MIN_FILES = 500
+_PARALLEL_BATCH_SIZE = 1000
+
+def _extract_syntax_worker(task: tuple) -> Dict[str, Any]:
+    """Извлекает информацию о синтаксисе из одного HTML-файла в дочернем процессе"""
+    filename, content = task
+    return BSLSyntaxExtractor('').extract_syntax_info(content, filename)
+
 class BSLSyntaxExtractor(BaseParser):
     """Экстрактор синтаксиса BSL из файлов справки 1С"""
     
@@ -160,36 +190,31 @@ class BSLSyntaxExtractor(BaseParser):
                 
                 # Парсим HTML и извлекаем текст
                 if html_content:
-                    section_soup = BeautifulSoup(html_content, 'html.parser')
+                    section_soup = BeautifulSoup(html_content, self.html_parser)
                     full_text = section_soup.get_text(strip=True)
                     
                     # Разбиваем на предложения и фильтруем
                     sentences = []
                     for sentence in full_text.split('.'):
                         sentence = sentence.strip()
-                        if sentence and not any(keyword in sentence for keyword in ['Методы', 'Описание', 'Доступность', 'См. также', 'Использование в версии']):
+                        if sentence and not _SECTION_KEYWORDS_RE.search(sentence):
                             sentences.append(sentence)
                     
                     if sentences:
-                        # Формируем полное описание с информацией об использовании
-                        full_description = []
-                        
-                        # Добавляем тип элементов
-                        if sentences:
-                            full_description.append(sentences[0])  # Первое предложение - тип элементов
+                        # Предложения с информацией об обходе и индексации (один проход на предложение)
+                        usage_flags = [bool(_USAGE_KEYWORDS_RE.search(sentence)) for sentence in sentences]
                         
-                        # Добавляем информацию об обходе и индексации
-                        for sentence in sentences[1:]:
-                            if any(keyword in sentence for keyword in ['Для каждого', 'Из', 'Цикл', 'индекс', 'оператор']):
-                                full_description.append(sentence)
+                        # Формируем полное описание с информацией об использовании:
+                        # первое предложение - тип элементов, далее информация об обходе и индексации
+                        full_description = [sentences[0]]
+                        full_description.extend(
+                            sentence for sentence, is_usage in zip(sentences[1:], usage_flags[1:]) if is_usage
+                        )
                         
                         elements_info['description'] = '. '.join(full_description)
                         
                         # Дополнительно сохраняем информацию об использовании
-                        usage_info = []
-                        for sentence in sentences:
-                            if any(keyword in sentence for keyword in ['Для каждого', 'Из', 'Цикл', 'индекс', 'оператор']):
-                                usage_info.append(sentence)
+                        usage_info = [sentence for sentence, is_usage in zip(sentences, usage_flags) if is_usage]
                         
                         if usage_info:
                             elements_info['usage'] = '. '.join(usage_info)
@@ -212,7 +237,7 @@ class BSLSyntaxExtractor(BaseParser):
                                 if sentence_end > start:
                                     sentence = full_html[sentence_start:sentence_end].strip()
                                     # Очищаем от HTML тегов
-                                    sentence = BeautifulSoup(sentence, 'html.parser').get_text(strip=True)
+                                    sentence = BeautifulSoup(sentence, self.html_parser).get_text(strip=True)
                                     # Дополнительная очистка от лишнего текста
                                     if 'html' in sentence:
                                         sentence = sentence.split('html')[-1]
@@ -282,12 +307,14 @@ class BSLSyntaxExtractor(BaseParser):
             elif 'properties/' in filename:
                 result['category'] = 'property'
             
+            # Заголовки разделов и их текст собираем один раз для всех проходов ниже
+            chapters = [(elem, elem.get_text(strip=True)) for elem in soup.find_all('p', class_='V8SH_chapter')]
+            
             # Извлекаем синтаксис (поддержка множественных вариантов)
             syntax_variants = []
             current_variant = None
             
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 
                 if 'Вариант синтаксиса:' in text:
                     # Начинаем новый вариант
@@ -341,8 +368,7 @@ class BSLSyntaxExtractor(BaseParser):
                     result['syntax'] = syntax_variants[0]['syntax']
             
             # Извлекаем описание
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 if 'Описание' in text:
                     desc_elem = elem.find_next_sibling('p')
                     if desc_elem:
@@ -350,8 +376,7 @@ class BSLSyntaxExtractor(BaseParser):
                     break
             
             # Извлекаем доступность
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 if 'Доступность' in text:
                     avail_elem = elem.find_next_sibling('p')
                     if avail_elem:
@@ -366,8 +391,7 @@ class BSLSyntaxExtractor(BaseParser):
             current_variant = None
             
             # Проходим по всем элементам и собираем параметры для каждого варианта
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 
                 # Определяем текущий вариант
                 if 'Вариант синтаксиса:' in text:
@@ -389,17 +413,15 @@ class BSLSyntaxExtractor(BaseParser):
                             break
                     
                     for block in param_blocks:
-                        param_info = {}
-                        
-                        # Извлекаем имя параметра из div
+                        # Извлекаем имя параметра между < >; блоки без имени в результат не попадают,
+                        # поэтому остальной разбор для них не выполняем
                         param_text = block.get_text(strip=True)
-                        if '<' in param_text and '>' in param_text:
-                            # Извлекаем имя параметра между < >
-                            start = param_text.find('<') + 1
-                            end = param_text.find('>')
-                            if start > 0 and end > start:
-                                param_name = param_text[start:end]
-                                param_info['name'] = param_name
+                        start = param_text.find('<') + 1
+                        end = param_text.find('>')
+                        if not (start > 0 and end > start):
+                            continue
+                        
+                        param_info = {'name': param_text[start:end]}
                         
                         # Проверяем обязательность
                         if '(необязательный)' in param_text:
@@ -411,19 +433,19 @@ class BSLSyntaxExtractor(BaseParser):
                         next_elem = block.find_next_sibling()
                         if next_elem:
                             type_text = next_elem.get_text(strip=True)
-                            if 'Тип:' in type_text:
+                            type_start = type_text.find('Тип:')
+                            if type_start >= 0:
                                 # Извлекаем тип после "Тип:"
-                                type_start = type_text.find('Тип:') + 4
+                                type_start += 4
                                 type_end = type_text.find('.', type_start)
                                 if type_end > type_start:
                                     param_type = type_text[type_start:type_end].strip()
                                     param_info['type'] = param_type
                         
                         # Ищем описание параметра
-                        desc_elem = block.find_next_sibling()
-                        if desc_elem and desc_elem.name == 'br':
+                        if next_elem and next_elem.name == 'br':
                             # Описание идет после <br>
-                            desc_text = desc_elem.next_sibling
+                            desc_text = next_elem.next_sibling
                             if desc_text and isinstance(desc_text, str):
                                 param_info['description'] = desc_text.strip()
                             elif desc_text and hasattr(desc_text, 'get_text'):
@@ -443,8 +465,7 @@ class BSLSyntaxExtractor(BaseParser):
                                 param_info['type'] = type_info['type']
                                 param_info['type_description'] = type_info['description']
                         
-                        if param_info.get('name'):
-                            parameters_by_variant[current_variant].append(param_info)
+                        parameters_by_variant[current_variant].append(param_info)
             
             # Сохраняем параметры в правильном формате
             if parameters_by_variant:
@@ -460,8 +481,7 @@ class BSLSyntaxExtractor(BaseParser):
                 result['parameters'] = []
             
             # Извлекаем возвращаемое значение
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 if 'Возвращаемое значение' in text:
                     next_elem = elem.find_next_sibling('p')
                     if next_elem:
@@ -469,8 +489,7 @@ class BSLSyntaxExtractor(BaseParser):
                     break
             
             # Извлекаем версию
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 if 'Использование в версии' in text:
                     version_elem = elem.find_next_sibling('p', class_='V8SH_versionInfo')
                     if version_elem:
@@ -483,8 +502,7 @@ class BSLSyntaxExtractor(BaseParser):
                     break
             
             # Извлекаем пример
-            for elem in soup.find_all('p', class_='V8SH_chapter'):
-                text = elem.get_text(strip=True)
+            for elem, text in chapters:
                 if 'Пример' in text:
                     table = elem.find_next('table')
                     if table:
@@ -521,32 +539,17 @@ class BSLSyntaxExtractor(BaseParser):
             return
         
         title = syntax_info.get('title', '')
-        category = syntax_info.get('category', '')
-        syntax = syntax_info.get('syntax', '')
         
-        # Определяем тип по заголовку и синтаксису
-        if 'Функция' in title or 'function' in title.lower():
-            self.syntax_data['functions'][title] = syntax_info
-        elif 'Метод' in title or 'method' in title.lower():
-            self.syntax_data['methods'][title] = syntax_info
-        elif 'Свойство' in title or 'property' in title.lower():
-            self.syntax_data['properties'][title] = syntax_info
-        elif 'Оператор' in title or 'operator' in title.lower():
-            self.syntax_data['operators'][title] = syntax_info
-        elif 'Ключевое слово' in title or 'keyword' in title.lower():
-            self.syntax_data['keywords'][title] = syntax_info
-        elif category == 'object':
-            self.syntax_data['objects'][title] = syntax_info
-        else:
-            # По умолчанию добавляем в объекты
-            self.syntax_data['objects'][title] = syntax_info
+        # Определяем тип по заголовку; объекты и все прочее попадают в objects
+        category = next((name for name, pattern in _CATEGORY_PATTERNS if pattern.search(title)), 'objects')
+        self.syntax_data[category][title] = syntax_info
     
     def extract_all_syntax(self, max_files: int = None) -> Dict[str, Any]:
         """Извлекает синтаксис из всех HTML-файлов"""
         if not self.zip_file:
             return {}
         
-        html_files = [f for f in self.zip_file.namelist() if f.endswith('.html')]
+        html_files = [f for f in self.list_contents() if f.endswith('.html')]
         
         print(f"Найдено {len(html_files)} HTML файлов")
         
@@ -558,36 +561,26 @@ class BSLSyntaxExtractor(BaseParser):
             files_to_process = html_files
         
         processed = 0
-        for filename in files_to_process:
+        for syntax_info in self.iter_syntax_info(files_to_process):
+            filename = syntax_info.get('filename', '')
+            
+            # Проверяем на ошибки
+            if 'error' in syntax_info:
+                print(f"Ошибка в файле {filename}: {syntax_info['error']}")
+                continue
+            
             try:
-                # Читаем содержимое файла
-                content = self.zip_file.read(filename).decode('utf-8', errors='ignore')
-                
-                # Проверяем, что контент не пустой
-                if not content.strip():
-                    print(f"Пропускаем пустой файл: {filename}")
-                    continue
-                
-                # Извлекаем информацию о синтаксисе
-                syntax_info = self.extract_syntax_info(content, filename)
-                
-                # Проверяем на ошибки
-                if 'error' in syntax_info:
-                    print(f"Ошибка в файле {filename}: {syntax_info['error']}")
-                    continue
-                
                 # Категоризируем
                 self.categorize_syntax(syntax_info)
-                
-                processed += 1
-                if processed % 100 == 0:
-                    print(f"Обработано {processed} файлов...")
-                
             except Exception as e:
                 print(f"Ошибка при обработке файла {filename}: {e}")
                 import traceback
                 print(f"Детали ошибки: {traceback.format_exc()}")
                 continue
+            
+            processed += 1
+            if processed % 100 == 0:
+                print(f"Обработано {processed} файлов...")
         
         print(f"Обработка завершена. Обработано {processed} файлов.")
         
@@ -601,6 +594,37 @@ class BSLSyntaxExtractor(BaseParser):
             'data': self.syntax_data
         }
     
+    def iter_html_contents(self, files: List[str]) -> Iterator[tuple]:
+        """Выдает пары (имя файла, HTML-контент), пропуская пустые и нечитаемые файлы"""
+        for filename in files:
+            try:
+                content = self.zip_file.read(filename).decode('utf-8', errors='ignore')
+            except Exception as e:
+                print(f"Ошибка при обработке файла {filename}: {e}")
+                continue
+            
+            # Проверяем, что контент не пустой
+            if not content.strip():
+                print(f"Пропускаем пустой файл: {filename}")
+                continue
+            
+            yield filename, content
+    
+    def iter_syntax_info(self, files: List[str]) -> Iterator[Dict[str, Any]]:
+        """Выдает информацию о синтаксисе по каждому файлу в исходном порядке.
+        
+        На больших архивах разбор HTML выполняется в пуле процессов; чтение архива остается в текущем.
+        """
+        if len(files) < _PARALLEL_MIN_FILES or (os.cpu_count() or 1) < 2:
+            for filename, content in self.iter_html_contents(files):
+                yield self.extract_syntax_info(content, filename)
+            return
+        
+        with ProcessPoolExecutor() as executor:
+            for start in range(0, len(files), _PARALLEL_BATCH_SIZE):
+                batch = self.iter_html_contents(files[start:start + _PARALLEL_BATCH_SIZE])
+                yield from executor.map(_extract_syntax_worker, batch, chunksize=16)
+    
     def find_by_pattern(self, pattern: str) -> List[Dict[str, Any]]:
         """Ищет элементы по паттерну в заголовке или синтаксисе"""
         results = []
@@ -621,13 +645,14 @@ class BSLSyntaxExtractor(BaseParser):
     
     def export_to_json(self, filename: str) -> None:
         """Экспортирует данные в JSON файл"""
-        with open(filename, 'w', encoding='utf-8') as f:
+        # json.dump и построчная запись Markdown дают много мелких записей, поэтому буфер увеличен
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
             json.dump(self.syntax_data, f, ensure_ascii=False, indent=2)
         print(f"Данные экспортированы в {filename}")
     
     def export_to_markdown(self, filename: str) -> None:
         """Экспортирует данные в Markdown файл"""
-        with open(filename, 'w', encoding='utf-8') as f:
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write("# Справочник синтаксиса BSL 1С\n\n")
             
             for category, items in self.syntax_data.items():
@@ -664,6 +689,28 @@ class BSLSyntaxExtractor(BaseParser):
         """Реализация абстрактного метода parse"""
         return self.extract_all_syntax(max_files)
 
+def extract(hbk_file: str, max_files: int = None) -> Dict[str, Any]:
+    """Извлекает синтаксис из архива и возвращает данные по категориям без записи на диск"""
+    extractor = BSLSyntaxExtractor(hbk_file)
+    
+    if not extractor.open_archive():
+        return {}
+    
+    try:
+        print("=== Извлечение синтаксиса BSL ===")
+        results = extractor.extract_all_syntax(max_files=max_files)
+        
+        print("\n=== Статистика ===")
+        for category, count in results['statistics'].items():
+            print(f"{category}: {count}")
+        
+        return results['data']
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return {}
+    finally:
+        extractor.close()
+
 def main():
     """Основная функция"""
     parser = argparse.ArgumentParser(description='Экстрактор синтаксиса BSL из файлов справки 1С')
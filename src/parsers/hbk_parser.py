@@ -105,7 +105,7 @@ class HBKParser(BaseParser):
         }
         
         try:
-            file_list = self.zip_file.namelist()
+            file_list = self.list_contents()
             structure['total_files'] = len(file_list)
             
             # Анализируем файлы
@@ -151,7 +151,7 @@ class HBKParser(BaseParser):
             return []
         
         samples = []
-        html_files = [f for f in self.zip_file.namelist() if f.endswith('.html')]
+        html_files = [f for f in self.list_contents() if f.endswith('.html')]
         
         for i, filename in enumerate(html_files[:count]):
             try:
@@ -173,22 +173,12 @@ class HBKParser(BaseParser):
         """Реализация абстрактного метода parse"""
         return self.analyze_structure()
 
-def main():
-    """Основная функция для тестирования парсера"""
-    if len(sys.argv) != 2:
-        print("Использование: python hbk_parser.py <путь_к_hbk_файлу>")
-        sys.exit(1)
-    
-    hbk_file = sys.argv[1]
-    
-    if not os.path.exists(hbk_file):
-        print(f"Файл не найден: {hbk_file}")
-        sys.exit(1)
-    
+def analyze(hbk_file: str, output_file: str = 'data/hbk_analysis.json') -> Dict[str, Any]:
+    """Анализирует структуру архива, выводит сводку и сохраняет результаты в JSON"""
     parser = HBKParser(hbk_file)
     
     if not parser.open_archive():
-        sys.exit(1)
+        return {}
     
     try:
         # Анализируем структуру
@@ -223,13 +213,33 @@ def main():
             'samples': samples
         }
         
-        with open('data/hbk_analysis.json', 'w', encoding='utf-8') as f:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        
+        # json.dump пишет множеством мелких фрагментов, поэтому буфер увеличен
+        with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
         
-        print(f"\nРезультаты сохранены в data/hbk_analysis.json")
+        print(f"\nРезультаты сохранены в {output_file}")
+        
+        return results
         
     finally:
         parser.close()
 
+def main():
+    """Основная функция для тестирования парсера"""
+    if len(sys.argv) != 2:
+        print("Использование: python hbk_parser.py <путь_к_hbk_файлу>")
+        sys.exit(1)
+    
+    hbk_file = sys.argv[1]
+    
+    if not os.path.exists(hbk_file):
+        print(f"Файл не найден: {hbk_file}")
+        sys.exit(1)
+    
+    if not analyze(hbk_file):
+        sys.exit(1)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file